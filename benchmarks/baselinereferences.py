@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.foldergeneration import (
+    BENCHMARK_TEXT, FULL_REFERENCES_DIRECTORY, benchmark_images,
+    full_resolution_reference_cases)
+
+# Commit of the original folder generation, before any of the caching, region
+# of interest, tiling and downscaling work
+BASELINE_COMMIT = "09b2d40"
+
+# Renders one case with the folder generation of the checkout given as the
+# first argument. Its resources are found relative to the working directory,
+# which must be the fancyfolders directory of the checkout
+RENDER_SCRIPT = """
+import json
+import sys
+import types
+
+sys.path.insert(0, sys.argv[1])
+
+# The baseline imports the macOS bindings at module level, only to set folder
+# icons, which rendering never does
+try:
+    import Cocoa
+except ImportError:
+    sys.modules["Cocoa"] = types.ModuleType("Cocoa")
+
+from PIL import Image
+from fancyfolders.constants import FolderStyle, IconGenerationMethod, SFFont
+from fancyfolders.imagetransformations import generate_folder_icon
+
+kwargs = json.loads(sys.argv[2])
+kwargs["folder_style"] = FolderStyle[kwargs["folder_style"]]
+kwargs["generation_method"] = IconGenerationMethod[kwargs["generation_method"]]
+if "font_style" in kwargs:
+    kwargs["font_style"] = SFFont[kwargs["font_style"]]
+if "image" in kwargs:
+    with Image.open(kwargs["image"]) as image:
+        image.load()
+    kwargs["image"] = image
+
+generate_folder_icon(**kwargs).save(sys.argv[3])
+"""
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Writes the full resolution reference images with the folder "
+                    "generation of the baseline commit, so that the references check "
+                    "every later change against the original output. Run from the "
+                    "repository root, after checking out the baseline with "
+                    "git worktree add <path> {}, with: "
+                    "python -m benchmarks.baselinereferences <path>".format(BASELINE_COMMIT))
+    parser.add_argument("baseline", help="Checkout of the baseline commit")
+    args = parser.parse_args()
+
+    baseline_directory = os.path.abspath(args.baseline)
+    os.makedirs(FULL_REFERENCES_DIRECTORY, exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        # Source images are passed to the baseline as lossless files
+        image_paths = {}
+        for name, image in benchmark_images().items():
+            image_paths[name] = os.path.join(temporary_directory, name + ".png")
+            image.save(image_paths[name])
+
+        for case in full_resolution_reference_cases():
+            kwargs = {"folder_style": case.folder_style.name, "icon_scale": case.icon_scale,
+                      "tint_colour": None if case.tint_colour is None
+                      else list(case.tint_colour.value)}
+            if case.icon == "none":
+                kwargs["generation_method"] = "NONE"
+            elif case.icon.startswith("text_"):
+                kwargs.update(generation_method="TEXT", text=BENCHMARK_TEXT,
+                              font_style=case.icon.removeprefix("text_"))
+            else:
+                kwargs.update(generation_method="IMAGE", image=image_paths[case.icon])
+
+            filepath = os.path.join(FULL_REFERENCES_DIRECTORY, case.name() + ".png")
+            subprocess.run(
+                [sys.executable, "-c", RENDER_SCRIPT, baseline_directory,
+                 json.dumps(kwargs), filepath],
+                cwd=os.path.join(baseline_directory, "fancyfolders"), check=True)
+            print("Wrote", filepath)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from typing import Any
+
+from benchmarks.foldergeneration import (
+    BENCHMARK_FONTS, Case, available_fonts, generation_kwargs, synthetic_image)
+from fancyfolders.constants import FolderStyle, RenderEngine, TintColour
+from fancyfolders.imagetransformations import base_folder_image
+from fancyfolders.rendercache import clear_caches
+from fancyfolders.threadsafefoldergeneration import FolderGeneratorWorker
+
+# Longest allowed time from stopping a worker until it exits
+DEFAULT_BOUND_MS = 50.0
+
+
+def cancellation_cases() -> list[Case]:
+    """The slowest folder generation cases, at full resolution"""
+    cases = [Case(FolderStyle.big_sur_light, "image_large", 1.0, TintColour.red),
+             Case(FolderStyle.catalina, "image_large", 1.0, None)]
+    cases += [Case(FolderStyle.big_sur_dark, "text_" + font.name, 1.0, TintColour.red)
+              for font in available_fonts(BENCHMARK_FONTS)[:1]]
+    return cases
+
+
+def clear_render_caches() -> None:
+    """Empties the caches, except for the base folders which are decoded
+    once per process in a single step that cannot be cancelled
+    """
+    clear_caches()
+    for folder_style in FolderStyle:
+        base_folder_image(folder_style)
+
+
+def run_to_completion(kwargs: dict[str, Any], engine: RenderEngine) -> float:
+    """Time of an uncancelled generation with empty caches, in seconds"""
+    clear_render_caches()
+    worker = FolderGeneratorWorker(uuid.uuid4(), engine=engine, **kwargs)
+    start_time = time.perf_counter()
+    worker.run()
+    return time.perf_counter() - start_time
+
+
+def stop_latencies(kwargs: dict[str, Any], engine: RenderEngine, trials: int,
+                   duration: float, rng: random.Random) -> list[float]:
+    """Stops workers at random times during generation with empty caches
+
+    :return: Time from stop() until the worker exited of each stopped
+        worker, in seconds
+    """
+    latencies = []
+    for _ in range(trials):
+        clear_render_caches()
+        worker = FolderGeneratorWorker(uuid.uuid4(), engine=engine, **kwargs)
+        thread = threading.Thread(target=worker.run)
+        thread.start()
+        time.sleep(rng.uniform(0, duration))
+        worker.stop()
+        thread.join()
+
+        # Workers that finished before being stopped have no latency
+        if worker.stop_latency is not None:
+            latencies.append(worker.stop_latency)
+    return latencies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Stops folder generation workers at random points and measures "
+                    "the worst case time until they exit. Run from the repository "
+                    "root with: python -m benchmarks.cancellation")
+    parser.add_argument("--trials", type=int, default=20,
+                        help="Number of stopped workers per case (default: 20)")
+    parser.add_argument("--bound-ms", type=float, default=DEFAULT_BOUND_MS,
+                        help="Fail if any worker takes longer to exit (default: {:g})"
+                        .format(DEFAULT_BOUND_MS))
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    images = {"image_large": synthetic_image((6000, 4000))}
+
+    worst_latency = 0.0
+    for case in cancellation_cases():
+        kwargs = generation_kwargs(case, images)
+        for engine in RenderEngine:
+            duration = run_to_completion(kwargs, engine)
+            latencies = stop_latencies(kwargs, engine, args.trials, duration, rng)
+            if not latencies:
+                continue
+
+            worst_latency = max(worst_latency, max(latencies))
+            print("{:<55} {:>6} run {:>7.1f} ms  stop latency median {:>5.1f} ms  "
+                  "max {:>5.1f} ms".format(
+                      case.name(), engine.name, duration * 1000,
+                      statistics.median(latencies) * 1000, max(latencies) * 1000))
+
+    print("Worst case stop latency: {:.1f} ms (bound {:g} ms)".format(
+        worst_latency * 1000, args.bound_ms))
+    return 0 if worst_latency * 1000 <= args.bound_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, NamedTuple, Optional
+
+import PIL
+from PIL import Image, ImageChops, ImageDraw, ImageFilter, ImageStat
+
+from fancyfolders.constants import (
+    MAXIMUM_ICON_SCALE_VALUE, MINIMUM_ICON_SCALE_VALUE, FolderStyle,
+    IconGenerationMethod, RenderEngine, SFFont, TintColour)
+from fancyfolders.imagetransformations import generate_folder_icon
+from fancyfolders.rendercache import clear_caches
+from fancyfolders.utilities import get_internal_font_location
+
+REFERENCES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "references")
+
+# Reference images are stored at a reduced size to keep the repository small
+REFERENCE_RESOLUTION = 256
+
+# A few references at full size, written by the folder generation of the
+# baseline commit, see benchmarks.baselinereferences
+FULL_REFERENCES_DIRECTORY = os.path.join(REFERENCES_DIRECTORY, "full")
+
+# Largest allowed difference of the blurred, premultiplied images, per channel
+MAXIMUM_PIXEL_DIFFERENCE = 6
+MAXIMUM_MEAN_DIFFERENCE = 0.5
+
+BENCHMARK_TEXT = "Aa"
+BENCHMARK_FONTS = (SFFont.ultralight, SFFont.regular, SFFont.black)
+REFERENCE_FONT = SFFont.black
+
+
+class Case(NamedTuple):
+    """One set of folder generation parameters"""
+    folder_style: FolderStyle
+    icon: str
+    icon_scale: float
+    tint_colour: Optional[TintColour]
+
+    def name(self) -> str:
+        """Unique name of the case, used for reference images and results"""
+        tint_name = "none" if self.tint_colour is None else self.tint_colour.name
+        return "{}-{}-scale{:g}-tint_{}".format(
+            self.folder_style.name, self.icon, self.icon_scale, tint_name)
+
+
+def synthetic_image(size: tuple[int, int], blurred: bool = True) -> Image.Image:
+    """Draws a deterministic RGBA test image with hard and soft edges
+
+    :param size: Size of the image (width, height)
+    :param blurred: Whether to soften the edges, like a photo, or keep them
+        hard, like a logo or a screenshot
+    :return: PIL Image (RGBA)
+    """
+    width, height = size
+    image = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((width * 0.1, height * 0.1, width * 0.6, height * 0.9),
+                 fill=(30, 30, 30, 255))
+    draw.rectangle((width * 0.5, height * 0.3, width * 0.9, height * 0.7),
+                   fill=(120, 60, 200, 180))
+    draw.line((0, height, width, 0), fill=(0, 0, 0, 255), width=max(1, width // 40))
+    if not blurred:
+        return image
+    return image.filter(ImageFilter.GaussianBlur(max(1, width // 200)))
+
+
+def generation_kwargs(case: Case, images: dict[str, Image.Image]) -> dict[str, Any]:
+    """Keyword arguments of generate_folder_icon for the case
+
+    :param case: Benchmark case
+    :param images: Source images by icon name
+    :return: Keyword arguments
+    """
+    kwargs: dict[str, Any] = {
+        "folder_style": case.folder_style, "icon_scale": case.icon_scale,
+        "tint_colour": None if case.tint_colour is None else case.tint_colour.value}
+
+    if case.icon == "none":
+        kwargs["generation_method"] = IconGenerationMethod.NONE
+    elif case.icon.startswith("text_"):
+        kwargs["generation_method"] = IconGenerationMethod.TEXT
+        kwargs["text"] = BENCHMARK_TEXT
+        kwargs["font_style"] = SFFont[case.icon.removeprefix("text_")]
+    else:
+        kwargs["generation_method"] = IconGenerationMethod.IMAGE
+        kwargs["image"] = images[case.icon]
+    return kwargs
+
+
+def available_fonts(fonts: tuple[SFFont, ...]) -> list[SFFont]:
+    """Fonts are not distributed with the repository, only use existing ones"""
+    return [font for font in fonts
+            if os.path.exists(get_internal_font_location(font.filename()))]
+
+
+def benchmark_cases() -> list[Case]:
+    """Every combination of folder style, icon, extreme and default scale,
+    and tint. Scale does not apply without an icon
+    """
+    icons = ["none", "image_small", "image_large"]
+    icons += ["text_" + font.name for font in available_fonts(BENCHMARK_FONTS)]
+
+    cases = []
+    for folder_style in FolderStyle:
+        for icon in icons:
+            scales = [1.0] if icon == "none" else \
+                [MINIMUM_ICON_SCALE_VALUE, 1.0, MAXIMUM_ICON_SCALE_VALUE]
+            for icon_scale in scales:
+                for tint_colour in (None, TintColour.red):
+                    cases.append(Case(folder_style, icon, icon_scale, tint_colour))
+    return cases
+
+
+def benchmark_images() -> dict[str, Image.Image]:
+    """Source images by icon name, a small one, a large photo sized one and
+    a large one with hard edges
+    """
+    return {"image_small": synthetic_image((128, 128)),
+            "image_large": synthetic_image((6000, 4000)),
+            "image_hard": synthetic_image((6000, 4000), blurred=False)}
+
+
+def reference_cases() -> list[Case]:
+    """Subset of the benchmark cases that are checked against reference
+    images, at the extremes of the scale only
+    """
+    icons = ["none", "image_small"]
+    icons += ["text_" + font.name for font in available_fonts((REFERENCE_FONT,))]
+
+    return [case for case in benchmark_cases() if case.icon in icons and
+            (case.icon == "none" or case.icon_scale != 1.0)]
+
+
+def full_resolution_reference_cases() -> list[Case]:
+    """Cases checked at full resolution against the baseline commit: large
+    images at the largest scale, which are downscaled and cover the most
+    rows, text at the smallest scale, and a tinted empty folder
+    """
+    cases = [Case(FolderStyle.big_sur_light, "image_hard", 1.0, None)]
+    for folder_style in FolderStyle:
+        cases.append(Case(folder_style, "image_large", MAXIMUM_ICON_SCALE_VALUE, TintColour.red))
+        cases.append(Case(folder_style, "image_hard", MAXIMUM_ICON_SCALE_VALUE, None))
+        cases += [Case(folder_style, "text_" + font.name, MINIMUM_ICON_SCALE_VALUE, None)
+                  for font in available_fonts((REFERENCE_FONT,))]
+        cases.append(Case(folder_style, "none", 1.0, TintColour.red))
+    return cases
+
+
+def time_case(case: Case, images: dict[str, Image.Image], engine: RenderEngine,
+              repeat: int) -> dict[str, Any]:
+    """Times a case with empty caches (cold) and again with all caches
+    filled (warm), keeping the median of each
+
+    :return: Timing results in milliseconds
+    """
+    kwargs = generation_kwargs(case, images)
+    cold_times, warm_times, stage_times = [], [], []
+
+    for _ in range(repeat):
+        clear_caches()
+        stage_timings: dict[str, float] = {}
+        start_time = time.perf_counter()
+        generate_folder_icon(engine=engine, stage_timings=stage_timings, **kwargs)
+        cold_times.append(time.perf_counter() - start_time)
+        stage_times.append(stage_timings)
+
+        start_time = time.perf_counter()
+        generate_folder_icon(engine=engine, **kwargs)
+        warm_times.append(time.perf_counter() - start_time)
+
+    stages = sorted({stage for timings in stage_times for stage in timings})
+    return {
+        "name": case.name(), "engine": engine.name,
+        "cold_ms": statistics.median(cold_times) * 1000,
+        "warm_ms": statistics.median(warm_times) * 1000,
+        "stages_ms": {stage: statistics.median(
+            timings.get(stage, 0.0) for timings in stage_times) * 1000
+            for stage in stages}}
+
+
+def perceptual_difference(image: Image.Image, reference: Image.Image) -> tuple[int, float]:
+    """Compares two images as they would be seen: premultiplied by their
+    alpha, so invisible colours are ignored, and slightly blurred, so that
+    rounding differences of single pixels are ignored
+
+    :return: Largest difference of any channel, Mean difference of the
+        most different channel
+    """
+    def prepared(prepared_image: Image.Image) -> Image.Image:
+        return prepared_image.convert("RGBa").filter(ImageFilter.GaussianBlur(1))
+
+    difference = ImageChops.difference(prepared(image), prepared(reference))
+    maximum = max(band_maximum for _, band_maximum in difference.getextrema())
+    return maximum, max(ImageStat.Stat(difference).mean)
+
+
+def check_references(images: dict[str, Image.Image], update: bool) -> list[dict[str, Any]]:
+    """Checks the output of every engine against the reference images, or
+    writes new reduced size reference images with the PIL engine. The full
+    size ones are only written by benchmarks.baselinereferences
+
+    :return: Results of each check
+    """
+    results = []
+    reference_sets = [(reference_cases(), REFERENCES_DIRECTORY, REFERENCE_RESOLUTION)]
+    if not update:
+        reference_sets.append((full_resolution_reference_cases(), FULL_REFERENCES_DIRECTORY, None))
+
+    for cases, directory, resolution in reference_sets:
+        for case in cases:
+            filepath = os.path.join(directory, case.name() + ".png")
+            kwargs = generation_kwargs(case, images)
+
+            if update:
+                os.makedirs(directory, exist_ok=True)
+                generate_folder_icon(resolution=resolution, **kwargs).save(filepath)
+                continue
+
+            result = {"name": case.name(), "resolution": resolution or case.folder_style.size()}
+            if not os.path.exists(filepath):
+                results.append({**result, "engine": None, "passed": False,
+                                "error": "missing reference image"})
+                continue
+
+            with Image.open(filepath) as reference:
+                reference.load()
+            for engine in RenderEngine:
+                clear_caches()
+                image = generate_folder_icon(resolution=resolution, engine=engine, **kwargs)
+                maximum, mean = perceptual_difference(image, reference)
+                results.append({
+                    **result, "engine": engine.name,
+                    "max_difference": maximum, "mean_difference": mean,
+                    "passed": maximum <= MAXIMUM_PIXEL_DIFFERENCE and
+                    mean <= MAXIMUM_MEAN_DIFFERENCE})
+    return results
+
+
+def environment() -> dict[str, Any]:
+    """Commit and versions the results were measured with"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {"commit": commit, "python": platform.python_version(),
+            "pillow": PIL.__version__, "platform": platform.platform()}
+
+
+def print_comparison(results: list[dict[str, Any]], previous_filepath: str) -> None:
+    """Prints the speedup of each case relative to previous results"""
+    with open(previous_filepath) as file:
+        previous = {(result["name"], result["engine"]): result
+                    for result in json.load(file)["timings"]}
+
+    ratios = []
+    for result in results:
+        old_result = previous.get((result["name"], result["engine"]))
+        if old_result is None:
+            continue
+        ratio = old_result["cold_ms"] / result["cold_ms"]
+        ratios.append(ratio)
+        print("{:<55} {:>6} {:>9.1f} -> {:>7.1f} ms  x{:.2f}".format(
+            result["name"], result["engine"], old_result["cold_ms"],
+            result["cold_ms"], ratio))
+
+    if ratios:
+        print("Geometric mean speedup: x{:.2f}".format(
+            statistics.geometric_mean(ratios)))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Times generate_folder_icon across folder styles, icon types, "
+                    "scales, fonts, tints and engines, and checks its output "
+                    "against the reference images. Run from the repository root "
+                    "with: python -m benchmarks.foldergeneration")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare to")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Number of times to time each case (default: 3)")
+    parser.add_argument("--update-references", action="store_true",
+                        help="Write new reference images instead of checking them")
+    parser.add_argument("--skip-timings", action="store_true",
+                        help="Only check the reference images")
+    args = parser.parse_args()
+
+    images = benchmark_images()
+
+    references = check_references(images, args.update_references)
+    if args.update_references:
+        print("Wrote reference images to", REFERENCES_DIRECTORY)
+        return 0
+
+    for reference in references:
+        if not reference["passed"]:
+            print("Reference mismatch:", reference, file=sys.stderr)
+    print("{}/{} reference checks passed".format(
+        sum(reference["passed"] for reference in references), len(references)))
+
+    timings = []
+    if not args.skip_timings:
+        for case in benchmark_cases():
+            for engine in RenderEngine:
+                result = time_case(case, images, engine, args.repeat)
+                timings.append(result)
+                print("{:<55} {:>6} cold {:>7.1f} ms  warm {:>6.2f} ms".format(
+                    result["name"], result["engine"], result["cold_ms"],
+                    result["warm_ms"]))
+
+        if args.compare:
+            print_comparison(timings, args.compare)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"environment": environment(), "references": references,
+                       "timings": timings}, file, indent=2)
+
+    return 0 if all(reference["passed"] for reference in references) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
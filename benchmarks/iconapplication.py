@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from fancyfolders.constants import FolderStyle, IconGenerationMethod
+from fancyfolders.foldericons import FilesystemIconApplier, apply_many
+from fancyfolders.imagetransformations import generate_folder_icon
+
+# Numbers of folders handled at once to compare
+WORKER_COUNTS = (1, 2, 4, 8)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Sets the icons of many folders with the filesystem icon applier, "
+                    "at several levels of parallelism, and checks that a missing folder "
+                    "is reported without stopping the others. Run from the repository "
+                    "root with: python -m benchmarks.iconapplication")
+    parser.add_argument("--folders", type=int, default=24,
+                        help="Number of folders per run (default: 24)")
+    parser.add_argument("--resolution", type=int, default=None,
+                        help="Size of the folder icons (default: full size)")
+    args = parser.parse_args()
+
+    folder_images = [generate_folder_icon(folder_style, IconGenerationMethod.NONE,
+                                          resolution=args.resolution)
+                     for folder_style in FolderStyle]
+
+    passed = True
+    with tempfile.TemporaryDirectory() as directory:
+        for max_workers in WORKER_COUNTS:
+            paths = [os.path.join(directory, "{}-{}".format(max_workers, index))
+                     for index in range(args.folders)]
+            for path in paths:
+                os.mkdir(path)
+            # The last folder is missing, and must be the only one to fail
+            paths[-1] += "-missing"
+
+            start_time = time.perf_counter()
+            results = apply_many(
+                [(folder_images[index % len(folder_images)], path)
+                 for index, path in enumerate(paths)],
+                FilesystemIconApplier(), max_workers)
+            total_time = time.perf_counter() - start_time
+
+            failed = [result.path for result in results if result.error is not None]
+            passed &= failed == paths[-1:]
+            print("{} at once: {:>7.1f} ms per folder, {:.1f} folders/sec, {} failed".format(
+                max_workers, total_time * 1000 / len(paths), len(paths) / total_time,
+                len(failed)))
+
+    print("Per folder error reporting: {}".format("passed" if passed else "FAILED"))
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
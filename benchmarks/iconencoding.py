@@ -0,0 +1,49 @@
+import argparse
+import statistics
+import sys
+import time
+from typing import Callable
+
+from PIL import Image
+
+from fancyfolders.constants import FolderStyle, IconEncoding
+from fancyfolders.iconencoding import _encoded_icns, encoded_folder_icon
+from fancyfolders.imagetransformations import base_folder_image
+
+
+def encoders() -> dict[str, Callable[[Image.Image], bytes | memoryview]]:
+    """Every icon encoding, uncached, and the raw pixels for reference"""
+    encoders = {encoding.name: lambda image, encoding=encoding: encoded_folder_icon(
+                    image, encoding) for encoding in IconEncoding}
+    encoders[IconEncoding.ICNS.name] = _encoded_icns
+    encoders["raw RGBA"] = lambda image: image.tobytes()
+    return encoders
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Measures the time and size of every folder icon encoding on the "
+                    "base folder of each style. Run from the repository root with: "
+                    "python -m benchmarks.iconencoding")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Number of encodes of each folder, the median is kept "
+                             "(default: 5)")
+    args = parser.parse_args()
+
+    for folder_style in FolderStyle:
+        image = base_folder_image(folder_style)
+        for name, encode in encoders().items():
+            times = []
+            for _ in range(args.repeat):
+                start_time = time.perf_counter()
+                image_data = encode(image)
+                times.append(time.perf_counter() - start_time)
+
+            print("{:<14} {:<9} {:>7.1f} ms {:>9.1f} KiB".format(
+                folder_style.name, name, statistics.median(times) * 1000,
+                len(image_data) / 1024))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# Modules that must load without the application, i.e. in worker processes
+HEADLESS_MODULES = ("fancyfolders.imagetransformations",
+                    "fancyfolders.batchrendering",
+                    "fancyfolders.processrendering")
+
+# Top level packages of Qt and PyObjC, which headless modules must not import,
+# and of NumPy, which only the NumPy engine loads once it is used
+FORBIDDEN_PACKAGES = ("PySide6", "shiboken6", "Cocoa", "AppKit", "Foundation", "objc",
+                      "numpy")
+
+# Longest allowed cumulative import time of each module
+DEFAULT_BOUND_MS = 250.0
+
+# Modules are imported from the repository root, wherever this is run from
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Line of the -X importtime output: self time, cumulative time, indented name
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def imported_modules(module: str) -> dict[str, float]:
+    """Imports the module in a new interpreter
+
+    :return: Cumulative import time in milliseconds of every module it
+        imported, by module name
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                             capture_output=True, text=True, check=True,
+                             cwd=REPOSITORY_DIRECTORY)
+    return {match[4]: int(match[2]) / 1000
+            for match in map(IMPORT_TIME_LINE.match, process.stderr.splitlines()) if match}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Checks that the folder generation modules import without Qt, "
+                    "PyObjC or NumPy, and measures how long they take to import. Run from the "
+                    "repository root with: python -m benchmarks.importtime")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Number of imports of each module, the fastest is kept "
+                             "(default: 5)")
+    parser.add_argument("--bound-ms", type=float, default=DEFAULT_BOUND_MS,
+                        help="Fail if any module takes longer to import (default: {:g})"
+                        .format(DEFAULT_BOUND_MS))
+    args = parser.parse_args()
+
+    passed = True
+    for module in HEADLESS_MODULES:
+        runs = [imported_modules(module) for _ in range(args.repeat)]
+        import_time = min(modules[module] for modules in runs)
+        forbidden = sorted({name for name in runs[0]
+                            if name.split(".")[0] in FORBIDDEN_PACKAGES})
+
+        passed &= import_time <= args.bound_ms and not forbidden
+        print("{:<40} {:>6.1f} ms  {}".format(
+            module, import_time,
+            "imports " + ", ".join(forbidden) if forbidden else "no Qt, PyObjC or NumPy"))
+
+    print("Import time bound {:g} ms: {}".format(args.bound_ms, "passed" if passed else "FAILED"))
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
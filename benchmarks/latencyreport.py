@@ -0,0 +1,37 @@
+import argparse
+import json
+import statistics
+import sys
+
+from fancyfolders.latencytracing import TRACE_DURATIONS
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Summarizes a latency log written by the application when started "
+                    "with FANCYFOLDERS_LATENCY_LOG=<file>, to compare interaction latency "
+                    "across releases. Run from the repository root with: "
+                    "python -m benchmarks.latencyreport <file>")
+    parser.add_argument("log", help="JSON lines latency log")
+    args = parser.parse_args()
+
+    with open(args.log) as file:
+        records = [json.loads(line) for line in file if line.strip()]
+
+    displayed = [record for record in records if record["outcome"] == "painted"]
+    print("{} tasks displayed ({} from the preview cache), {} cancelled or discarded".format(
+        len(displayed), sum(record.get("cached", False) for record in displayed),
+        len(records) - len(displayed)))
+
+    for name in TRACE_DURATIONS:
+        values = [record[name] for record in displayed if name in record]
+        if len(values) < 2:
+            continue
+        p95 = statistics.quantiles(values, n=20, method="inclusive")[18]
+        print("{:<19} p50 {:>7.1f} ms  p95 {:>7.1f} ms  ({} tasks)".format(
+            name, statistics.median(values), p95, len(values)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Paints are measured without a window system if there is none
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PIL.Image import Image
+from PySide6.QtWidgets import QApplication
+
+from fancyfolders.constants import FolderStyle, IconGenerationMethod
+from fancyfolders.imagetransformations import generate_folder_icon
+from fancyfolders.previewframes import preview_frame
+from fancyfolders.ui.components.centrefoldericon import CentreFolderIcon
+
+# Widget sizes cycled through while resizing, in logical pixels
+RESIZE_SIZES = ((400, 240), (640, 480), (900, 700))
+
+
+def measure_repaints(widget: CentreFolderIcon, repaints: int, resize: bool) -> float:
+    """Repaints the widget synchronously, like spinner ticks and window
+    exposes do, or like resizing the window if resize is set
+
+    :return: Median time of a repaint in milliseconds
+    """
+    times = []
+    for index in range(repaints):
+        if resize:
+            widget.resize(*RESIZE_SIZES[index % len(RESIZE_SIZES)])
+        start_time = time.perf_counter()
+        widget.repaint()
+        times.append(time.perf_counter() - start_time)
+    return statistics.median(times) * 1000
+
+
+def measure_set_image(widget: CentreFolderIcon, image: Image, repeat: int,
+                      prepared: bool) -> float:
+    """Sets new folder icons on the widget, like the UI thread does when a
+    render completes. Prepared frames are made beforehand, like the worker
+    threads do
+
+    :return: Median time on the UI thread in milliseconds
+    """
+    times = []
+    for _ in range(repeat):
+        new_image = image.copy()
+        if prepared:
+            preview_frame(new_image, FolderStyle.big_sur_light)
+        start_time = time.perf_counter()
+        widget.set_folder_image(new_image, FolderStyle.big_sur_light)
+        times.append(time.perf_counter() - start_time)
+    return statistics.median(times) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Measures the time the UI thread spends setting a full size preview "
+                    "on the centre folder icon, and painting it without and with "
+                    "resizing between paints. Run from the repository root with: "
+                    "python -m benchmarks.previewpainting")
+    parser.add_argument("--repaints", type=int, default=60,
+                        help="Number of previews set and repaints of each kind (default: 60)")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    widget = CentreFolderIcon()
+    widget.resize(*RESIZE_SIZES[1])
+    widget.show()
+    image = generate_folder_icon(FolderStyle.big_sur_light, IconGenerationMethod.NONE)
+
+    for name, prepared in (("set image, unprepared", False), ("set image, prepared", True)):
+        print("{:<22} median {:>6.2f} ms".format(
+            name, measure_set_image(widget, image, args.repaints, prepared)))
+    app.processEvents()
+
+    for name, resize in (("repaint", False), ("resize", True)):
+        print("{:<22} median {:>6.2f} ms".format(
+            name, measure_repaints(widget, args.repaints, resize)))
+
+    stats = widget.paint_stats()
+    print("{} paints, {} scaled the pixmap, average paint {:.2f} ms".format(
+        stats.paints, stats.scales, stats.average_ms()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import argparse
+import statistics
+import sys
+import threading
+import time
+from typing import Any, Callable
+
+from benchmarks.foldergeneration import (
+    BENCHMARK_FONTS, Case, available_fonts, generation_kwargs, synthetic_image)
+from fancyfolders.constants import (
+    RENDER_PROCESSES, FolderStyle, RenderExecutor, TintColour)
+from fancyfolders.imagetransformations import generate_folder_icon
+from fancyfolders.processrendering import ProcessRenderer
+from fancyfolders.rendercache import clear_caches
+
+# Interval of the simulated UI event loop, in seconds
+TICK_INTERVAL = 0.001
+
+# Seconds to wait for the worker processes to finish starting up
+PROCESS_STARTUP_TIME = 5.0
+
+
+def executor_cases() -> list[Case]:
+    """Renders that change one parameter at a time, like a user would"""
+    cases = [Case(folder_style, "image_small", 1.0, tint_colour)
+             for folder_style in FolderStyle for tint_colour in (None, TintColour.red)]
+    cases += [Case(FolderStyle.big_sur_light, "text_" + font.name, icon_scale, None)
+              for font in available_fonts(BENCHMARK_FONTS)
+              for icon_scale in (0.5, 1.0, 1.5)]
+    return cases
+
+
+def measure(render: Callable[..., Any], kwargs_list: list[dict[str, Any]],
+            repeat: int) -> dict[str, float]:
+    """Renders every case on a background thread, while the main thread
+    ticks like an event loop and records how late each tick was
+
+    :return: Results in milliseconds
+    """
+    lateness: list[float] = []
+    render_times: list[float] = []
+
+    def run_renders() -> None:
+        for _ in range(repeat):
+            for kwargs in kwargs_list:
+                start_time = time.perf_counter()
+                render(**kwargs)
+                render_times.append(time.perf_counter() - start_time)
+
+    thread = threading.Thread(target=run_renders)
+    thread.start()
+    while thread.is_alive():
+        expected_time = time.perf_counter() + TICK_INTERVAL
+        time.sleep(TICK_INTERVAL)
+        lateness.append(max(0.0, time.perf_counter() - expected_time))
+    thread.join()
+
+    lateness.sort()
+    return {"render_ms": statistics.median(render_times) * 1000,
+            "tick_late_p99_ms": lateness[int(len(lateness) * 0.99)] * 1000,
+            "tick_late_max_ms": lateness[-1] * 1000}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Measures how much folder generation on a thread and in worker "
+                    "processes delays a simulated UI thread. Run from the repository "
+                    "root with: python -m benchmarks.renderexecutors")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Number of times to render each case (default: 3)")
+    parser.add_argument("--resolution", type=int, default=None,
+                        help="Size of the rendered folders (default: full size)")
+    args = parser.parse_args()
+
+    images = {"image_small": synthetic_image((1024, 1024))}
+    kwargs_list = [dict(generation_kwargs(case, images), resolution=args.resolution)
+                   for case in executor_cases()]
+
+    for executor in RenderExecutor:
+        clear_caches()
+        if executor is RenderExecutor.PROCESS:
+            renderer = ProcessRenderer(RENDER_PROCESSES)
+            time.sleep(PROCESS_STARTUP_TIME)
+            results = measure(renderer.render, kwargs_list, args.repeat)
+            renderer.shutdown()
+        else:
+            results = measure(generate_folder_icon, kwargs_list, args.repeat)
+
+        print("{:<8} render median {:>6.1f} ms  UI tick late p99 {:>5.1f} ms  "
+              "max {:>5.1f} ms".format(executor.name, results["render_ms"],
+                                       results["tick_late_p99_ms"],
+                                       results["tick_late_max_ms"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from PIL import ImageChops
+
+from benchmarks.foldergeneration import BENCHMARK_FONTS, available_fonts
+from fancyfolders.constants import FolderStyle, SFFont
+from fancyfolders.imagetransformations import (
+    _composited_text_mask, _rasterized_text_mask, sf_font)
+from fancyfolders.rendercache import cache_stats, clear_caches
+from fancyfolders.utilities import get_internal_font_location
+
+# Typed one character at a time: words, then SF Symbols, which are large and
+# complex glyphs in the private use area of the SF fonts
+TYPED_TEXT = "Fancy Folders \U00100185\U001001A5\U00100300\U00100185"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Measures the text masks of typing a text one character at a time "
+                    "and deleting it again, composited from cached glyphs compared to "
+                    "rasterized as a whole, and checks that both give the same masks. "
+                    "Run from the repository root with: python -m benchmarks.textmasks")
+    parser.add_argument("--text", default=TYPED_TEXT,
+                        help="Text to type (default: words and SF Symbols)")
+    # Fonts are not distributed with the repository, default to one that is there
+    fonts = available_fonts(BENCHMARK_FONTS)
+    parser.add_argument("--font", choices=[font.name for font in SFFont],
+                        default=fonts[0].name if fonts else None,
+                        help="Font weight (default: the first benchmark font in assets/fonts)")
+    parser.add_argument("--resolution", type=int, default=FolderStyle.big_sur_light.size(),
+                        help="Folder size in pixels (default: full size)")
+    args = parser.parse_args()
+
+    if args.font is None:
+        print("None of the benchmark fonts are in assets/fonts")
+        return 1
+
+    font_style = SFFont[args.font]
+    if not os.path.exists(get_internal_font_location(font_style.filename())):
+        print("Font {} is not in assets/fonts, it is not distributed with the "
+              "repository".format(font_style.filename()))
+        return 1
+
+    # Each prefix of the text as it is typed, then as it is deleted again
+    texts = [args.text[:length] for length in range(1, len(args.text) + 1)]
+    texts += texts[-2::-1]
+
+    clear_caches()
+    font = sf_font(font_style, int(args.resolution / 2))
+    rasterized_times, composited_times = [], []
+    for text in texts:
+        start_time = time.perf_counter()
+        expected_mask = _rasterized_text_mask(text, args.resolution, font)
+        rasterized_times.append(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        mask = _composited_text_mask(text, font_style, font)
+        composited_times.append(time.perf_counter() - start_time)
+
+        if mask.size != expected_mask.size or \
+                ImageChops.difference(mask, expected_mask).getbbox() is not None:
+            print("Mask differs for text {!r}".format(text))
+            return 1
+
+    glyph_stats = cache_stats()["glyph"]
+    print("{} masks of up to {} characters, all the same".format(len(texts), len(args.text)))
+    print("rasterized  median {:>6.2f} ms  max {:>6.2f} ms".format(
+        statistics.median(rasterized_times) * 1000, max(rasterized_times) * 1000))
+    print("composited  median {:>6.2f} ms  max {:>6.2f} ms  ({} glyphs rasterized)".format(
+        statistics.median(composited_times) * 1000, max(composited_times) * 1000,
+        glyph_stats.misses))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import argparse
+import colorsys
+import statistics
+import sys
+import time
+
+from benchmarks.foldergeneration import BENCHMARK_FONTS, BENCHMARK_TEXT, available_fonts
+from fancyfolders.constants import FolderStyle, IconGenerationMethod
+from fancyfolders.imagetransformations import generate_folder_icon
+from fancyfolders.previewframes import TintPreview, _cropped_frame
+
+
+def picked_colours(count: int) -> list[tuple[int, int, int]]:
+    """Colours around the hue wheel, like dragging across the colour dialog,
+    none of them repeated so that no tinted folder is cached
+
+    :return: Colours (r, g, b)
+    """
+    return [tuple(round(value * 255) for value in colorsys.hsv_to_rgb(
+        index / count, 0.5 + 0.4 * (index % 2), 0.9)) for index in range(count)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Measures how many tint colours per second the preview can follow "
+                    "while the multicolour dialog is open, by tinting the untinted preview "
+                    "compared to generating each tinted preview, and checks that both give "
+                    "the same frames. Run from the repository root with: "
+                    "python -m benchmarks.tintpreview")
+    parser.add_argument("--resolution", type=int, default=800,
+                        help="Preview resolution in pixels (default: 800)")
+    parser.add_argument("--colours", type=int, default=60,
+                        help="Number of colours picked (default: 60)")
+    args = parser.parse_args()
+
+    # Fonts are not distributed with the repository, use the first one there is
+    fonts = available_fonts(BENCHMARK_FONTS)
+    if not fonts:
+        print("None of the benchmark fonts are in assets/fonts")
+        return 1
+
+    for folder_style in FolderStyle:
+        kwargs = {"generation_method": IconGenerationMethod.TEXT, "text": BENCHMARK_TEXT,
+                  "font_style": fonts[0], "resolution": args.resolution}
+        untinted_image = generate_folder_icon(folder_style, **kwargs)
+
+        start_time = time.perf_counter()
+        tint_preview = TintPreview(untinted_image, folder_style)
+        setup_time = time.perf_counter() - start_time
+
+        generated_times, tinted_times = [], []
+        for tint_colour in picked_colours(args.colours):
+            start_time = time.perf_counter()
+            expected_frame = _cropped_frame(generate_folder_icon(
+                folder_style, tint_colour=tint_colour, **kwargs), folder_style)
+            generated_times.append(time.perf_counter() - start_time)
+
+            start_time = time.perf_counter()
+            frame = tint_preview.frame(tint_colour)
+            tinted_times.append(time.perf_counter() - start_time)
+
+            if frame != expected_frame:
+                print("{}: frame differs for tint colour {}".format(
+                    folder_style.name, tint_colour))
+                return 1
+
+        print("{:<15} {} colours, setup {:>5.1f} ms, generated {:>6.2f} ms ({:>4.0f}/s), "
+              "tinted {:>5.2f} ms ({:>4.0f}/s)".format(
+                  folder_style.name, tint_preview.colours.width, setup_time * 1000,
+                  statistics.median(generated_times) * 1000,
+                  1 / statistics.median(generated_times),
+                  statistics.median(tinted_times) * 1000,
+                  1 / statistics.median(tinted_times)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
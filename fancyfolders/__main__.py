@@ -0,0 +1,24 @@
+import argparse
+import sys
+
+from fancyfolders import batchrendering
+
+##############################
+# COMMAND LINE
+##############################
+
+# Commands that work without the application, i.e. without Qt or Cocoa.
+# Worker processes may import this module again, only run as the main module
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m fancyfolders",
+        description="Fancy Folders without the application window")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    render_parser = commands.add_parser(
+        "render", help="Render folder icons from a spec file, in parallel")
+    batchrendering.add_arguments(render_parser)
+    render_parser.set_defaults(run=batchrendering.run)
+
+    args = parser.parse_args()
+    sys.exit(args.run(args))
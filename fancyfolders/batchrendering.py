@@ -0,0 +1,236 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, NamedTuple, Optional
+
+from fancyfolders.constants import (
+    DEFAULT_FONT, FolderStyle, IconGenerationMethod, RenderEngine, SFFont, TintColour)
+from fancyfolders.iconencoding import encoded_icns
+from fancyfolders.imagedecoding import decoded_image_file
+from fancyfolders.imagetransformations import generate_folder_icon, prewarm_render_caches
+
+# File formats that folder icons can be written as, by file extension
+OUTPUT_FORMATS = {".png": "PNG", ".icns": "ICNS"}
+
+
+class RenderSpec(NamedTuple):
+    """One folder icon to render, parsed from a row of a spec file"""
+    output: str
+    folder_style: FolderStyle
+    text: Optional[str]
+    image_path: Optional[str]
+    icon_scale: float
+    font_style: SFFont
+    tint_colour: Optional[tuple[int, int, int]]
+    resolution: Optional[int]
+
+    def generation_method(self) -> IconGenerationMethod:
+        """Icon generation method, depending on whether there is an icon"""
+        if self.image_path is not None:
+            return IconGenerationMethod.IMAGE
+        if self.text is not None:
+            return IconGenerationMethod.TEXT
+        return IconGenerationMethod.NONE
+
+
+# -----------------------------------------------------------------------------
+# Spec files
+
+def read_specs(spec_path: str, output_directory: str, output_format: str) -> list[RenderSpec]:
+    """Reads every row of a JSONL or CSV spec file. Each row has the fields:
+    style, text, image, scale, font, tint, resolution and output, all of
+    which are optional. Relative image paths are relative to the spec file,
+    relative output paths to the output directory.
+
+    :param spec_path: Path to a .jsonl or .csv file
+    :param output_directory: Directory to write the folder icons to
+    :param output_format: Extension of outputs that are not given, i.e. ".png"
+    :return: Parsed rows
+    :raises ValueError: A row is not valid, with its line number
+    """
+    with open(spec_path, newline="") as file:
+        if os.path.splitext(spec_path)[1].lower() == ".csv":
+            # Header is line 1, empty cells are missing values
+            rows = [(index + 2, {key: value for key, value in row.items() if value})
+                    for index, row in enumerate(csv.DictReader(file))]
+        else:
+            rows = [(index + 1, json.loads(line))
+                    for index, line in enumerate(file) if line.strip()]
+
+    spec_directory = os.path.dirname(os.path.abspath(spec_path))
+    specs = []
+    for index, (line_number, row) in enumerate(rows):
+        try:
+            specs.append(_parsed_spec(
+                row, index, spec_directory, output_directory, output_format))
+        except KeyError as error:
+            raise ValueError("{}, line {}: unknown value {}".format(
+                spec_path, line_number, error))
+        except (ValueError, TypeError) as error:
+            raise ValueError("{}, line {}: {}".format(spec_path, line_number, error))
+    return specs
+
+
+def _parsed_spec(row: dict[str, Any], index: int, spec_directory: str,
+                 output_directory: str, output_format: str) -> RenderSpec:
+    """Parses one row of a spec file
+
+    :param row: Field values by field name
+    :param index: Index of the row, used for outputs that are not given
+    :param spec_directory: Directory of the spec file
+    :param output_directory: Directory to write the folder icons to
+    :param output_format: Extension of outputs that are not given
+    :return: Parsed row
+    """
+    unknown_fields = set(row) - {"style", "text", "image", "scale", "font", "tint",
+                                 "resolution", "output"}
+    if unknown_fields:
+        raise ValueError("unknown fields " + ", ".join(sorted(unknown_fields)))
+
+    output = os.path.join(output_directory, row.get(
+        "output", "folder-{}{}".format(index + 1, output_format)))
+    if os.path.splitext(output)[1].lower() not in OUTPUT_FORMATS:
+        raise ValueError("output must end with one of " + ", ".join(OUTPUT_FORMATS))
+
+    image_path = row.get("image")
+    if image_path is not None:
+        image_path = os.path.join(spec_directory, image_path)
+
+    resolution = row.get("resolution")
+    return RenderSpec(
+        output=output,
+        folder_style=FolderStyle[row.get("style", FolderStyle.big_sur_light.name)],
+        # Empty text is no icon, as in the application
+        text=row.get("text") or None,
+        image_path=image_path,
+        icon_scale=float(row.get("scale", 1.0)),
+        font_style=SFFont[row.get("font", DEFAULT_FONT.name)],
+        tint_colour=_parsed_colour(row.get("tint")),
+        resolution=None if resolution is None else int(resolution))
+
+
+def _parsed_colour(value: Optional[str]) -> Optional[tuple[int, int, int]]:
+    """Parses a tint colour, either the name of a palette colour or a hex
+    colour, i.e. "red" or "#ff9aa2"
+
+    :param value: Colour, or None for no tint
+    :return: The colour (r, g, b), or None
+    """
+    if value is None:
+        return None
+    if value.startswith("#") and len(value) == 7:
+        return int(value[1:3], 16), int(value[3:5], 16), int(value[5:7], 16)
+    return TintColour[value].value
+
+
+# -----------------------------------------------------------------------------
+# Worker processes
+
+def render_to_file(spec: RenderSpec, engine: RenderEngine) -> float:
+    """Renders a folder icon and writes it to its output file
+
+    :param spec: Folder icon to render
+    :param engine: Implementation used to composite the icon onto the folder
+    :return: Time taken in seconds
+    """
+    start_time = time.perf_counter()
+
+    # Rows using the same image share one decoded image, and with it the
+    # cached icon mask
+    image = None
+    if spec.image_path is not None:
+        image = decoded_image_file(spec.image_path)
+
+    folder_image = generate_folder_icon(
+        spec.folder_style, spec.generation_method(), icon_scale=spec.icon_scale,
+        tint_colour=spec.tint_colour, text=spec.text, font_style=spec.font_style,
+        image=image, resolution=spec.resolution, engine=engine)
+
+    os.makedirs(os.path.dirname(os.path.abspath(spec.output)), exist_ok=True)
+    output_format = OUTPUT_FORMATS[os.path.splitext(spec.output)[1].lower()]
+    if output_format == "ICNS":
+        with open(spec.output, "wb") as file:
+            file.write(encoded_icns(folder_image))
+    else:
+        folder_image.save(spec.output, format=output_format)
+
+    return time.perf_counter() - start_time
+
+
+# -----------------------------------------------------------------------------
+# Command line
+
+def _positive_int(value: str) -> int:
+    """Parses a command line argument that must be a whole number above 0
+
+    :param value: Argument as given
+    :return: The number
+    :raises argparse.ArgumentTypeError: The argument is not a positive number
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be a positive whole number: " + value)
+    return number
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the arguments of the render command
+
+    :param parser: Parser of the render command
+    """
+    parser.add_argument("spec", help="JSONL or CSV file with one folder icon per row, "
+                                     "with the fields: style, text, image, scale, font, "
+                                     "tint, resolution and output")
+    parser.add_argument("--output-directory", default=".",
+                        help="Directory to write the folder icons to (default: current)")
+    parser.add_argument("--format", choices=[extension.lstrip(".") for extension
+                                             in OUTPUT_FORMATS], default="png",
+                        help="Format of rows without an output file (default: png)")
+    parser.add_argument("--workers", type=_positive_int, default=os.cpu_count(),
+                        help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--engine", choices=[engine.name.lower() for engine in RenderEngine],
+                        default=RenderEngine.PIL.name.lower(),
+                        help="Implementation used to composite the icon onto the folder")
+
+
+def run(args: argparse.Namespace) -> int:
+    """Renders every row of the spec file in parallel, writing each folder
+    icon as soon as it is done
+
+    :param args: Parsed arguments, see add_arguments
+    :return: Exit code, non zero if any folder icon could not be rendered
+    """
+    try:
+        specs = read_specs(args.spec, args.output_directory, "." + args.format)
+    except (OSError, ValueError) as error:
+        print("Could not read spec file:", error, file=sys.stderr)
+        return 2
+
+    engine = RenderEngine[args.engine.upper()]
+    failures = 0
+    start_time = time.perf_counter()
+
+    with ProcessPoolExecutor(args.workers, initializer=prewarm_render_caches) as executor:
+        futures = {executor.submit(render_to_file, spec, engine): spec for spec in specs}
+        for future in as_completed(futures):
+            spec = futures[future]
+            try:
+                render_time = future.result()
+                print("{} ({:.0f} ms)".format(spec.output, render_time * 1000))
+            except Exception as error:
+                failures += 1
+                print("Could not render {}: {}".format(spec.output, error), file=sys.stderr)
+
+    total_time = time.perf_counter() - start_time
+    rendered = len(specs) - failures
+    print("Rendered {} folder icons in {:.2f} s, {:.1f} icons/sec{}".format(
+        rendered, total_time, rendered / total_time if total_time else 0.0,
+        ", {} failed".format(failures) if failures else ""))
+    return 1 if failures else 0
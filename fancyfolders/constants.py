@@ -30,6 +30,18 @@ OUTER_HIGHLIGHT_Y_OFFSET = 0.00782  # Percentage of height
 
 ICON_BOX_SCALING_FACTOR = 0.84
 
+ICON_MASK_OVERSAMPLING = 3  # Icon box sizes of image detail kept for the mask
+
+FILTER_TILE_HEIGHT = 128  # Rows filtered between checks for cancellation
+
+RENDER_PROCESSES = 2  # One can finish a cancelled render while the next starts
+
+PREVIEW_CACHE_BUDGET = 64 * 1024 * 1024  # Bytes of finished previews to keep
+
+GLYPH_CACHE_BUDGET = 32 * 1024 * 1024  # Bytes of rasterized text glyphs to keep
+
+ICON_APPLIER_THREADS = 4  # Folders whose icons are encoded and set at once
+
 
 ######################
 # TYPES
@@ -41,6 +53,54 @@ class IconGenerationMethod(Enum):
     TEXT = 2
 
 
+class RenderEngine(Enum):
+    """Implementation used to composite the icon onto the folder"""
+    PIL = 0
+    NUMPY = 1
+
+
+class RenderExecutor(Enum):
+    """Where folder generation runs: on a thread of the application, or in a
+    pool of worker processes
+    """
+    THREAD = 0
+    PROCESS = 1
+
+
+class IconEncoding(Enum):
+    """Format in which folder icons are handed to the icon applier"""
+    ICNS = 0  # Every size Finder displays, slowest to encode
+    PNG = 1  # Default compression, smallest single size
+    PNG_FAST = 2  # Lowest compression level
+    TIFF = 3  # Uncompressed, a header in front of the raw RGBA pixels
+
+    def extension(self) -> str:
+        """Extension of files in this format
+
+        :return: Extension, i.e. ".png"
+        """
+        return {
+            IconEncoding.ICNS: ".icns",
+            IconEncoding.PNG: ".png",
+            IconEncoding.PNG_FAST: ".png",
+            IconEncoding.TIFF: ".tiff",
+        }[self]
+
+
+class TraceEvent(Enum):
+    """Points in the life of a folder generation task at which its latency
+    is traced, see latencytracing
+    """
+    INPUT = 0  # The user changed an input
+    SUBMITTED = 1  # Requested from the scheduler
+    STARTED = 2  # Started running on a worker thread
+    RENDERED = 3  # Finished generating, completed signal emitted
+    CANCELLED = 4  # Stopped or replaced before it finished generating
+    RECEIVED = 5  # Accepted by the main window for display
+    DISCARDED = 6  # Finished generating, but a newer task was waited for
+    PAINTED = 7  # Displayed on screen
+
+
 class FolderStyle(Enum):
     big_sur_light = 0
     big_sur_dark = 1
@@ -0,0 +1,197 @@
+import os
+import sys
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType
+from typing import Iterable, NamedTuple, Optional
+
+from PIL.Image import Image
+
+from fancyfolders.constants import ICON_APPLIER_THREADS, IconEncoding
+from fancyfolders.iconencoding import encoded_folder_icon
+
+# Setting folder icons is the only part of the app that needs the native
+# macOS API. It is loaded on first use, so that the folder generation, the
+# batch render command and the worker processes can be imported without
+# PyObjC (i.e. on other platforms), and without paying for its import.
+
+
+class IconApplier(ABC):
+    """Sets encoded folder icons on folders. Implementations must be safe to
+    call from several threads at once
+    """
+
+    def __init__(self, encoding: IconEncoding) -> None:
+        """Creates a new icon applier
+
+        :param encoding: Format in which folder icons are handed over
+        """
+        self.encoding = encoding
+
+    def encode(self, pil_image: Image) -> bytes | memoryview:
+        """Encodes the folder icon in the format that apply needs
+
+        :param pil_image: PIL Image of the folder icon
+        :return: Encoded image data
+        """
+        return encoded_folder_icon(pil_image, self.encoding)
+
+    @abstractmethod
+    def apply(self, image_data: bytes | memoryview, path: str) -> None:
+        """Sets the icon of the folder at the specified path
+
+        :param image_data: Encoded image data of the folder icon, see encode
+        :param path: Absolute path to the folder
+        """
+
+
+class CocoaIconApplier(IconApplier):
+    """Sets folder icons using the native macOS API, interfaced through
+    PyObjC, the way Finder shows them
+    """
+
+    def __init__(self, encoding: IconEncoding = IconEncoding.ICNS) -> None:
+        """Creates a new Cocoa icon applier
+
+        :param encoding: Format in which folder icons are handed to NSImage.
+            By default every size Finder displays, rather than letting it
+            resample a single image on demand
+        """
+        super().__init__(encoding)
+
+    def apply(self, image_data: bytes | memoryview, path: str) -> None:
+        """Sets the icon of the folder at the specified path. Can be called
+        from any thread
+
+        :param image_data: Encoded image data of the folder icon
+        :param path: Absolute path to the folder
+        :raises RuntimeError: The native macOS API is not available
+        """
+        cocoa, objc = _cocoa_backend()
+
+        # Threads other than the main one have no autorelease pool of their own
+        with objc.autorelease_pool():
+            # Wraps the encoded data without copying it, it outlives the call
+            ns_data = cocoa.NSData.dataWithBytesNoCopy_length_freeWhenDone_(
+                image_data, len(image_data), False)
+            ns_image = cocoa.NSImage.alloc().initWithData_(ns_data)
+            if not cocoa.NSWorkspace.sharedWorkspace().setIcon_forFile_options_(
+                    ns_image, path, 0):
+                raise OSError("Could not set the icon of " + path)
+
+
+class FilesystemIconApplier(IconApplier):
+    """Stands in for the native API on other platforms: writes the icon as a
+    hidden file inside the folder, and a .directory file pointing to it,
+    which some Linux file managers use as the folder icon
+    """
+
+    def __init__(self, encoding: IconEncoding = IconEncoding.PNG) -> None:
+        """Creates a new filesystem icon applier
+
+        :param encoding: Format of the icon file
+        """
+        super().__init__(encoding)
+        self.icon_filename = ".folder-icon" + encoding.extension()
+
+    def apply(self, image_data: bytes | memoryview, path: str) -> None:
+        """Writes the icon files into the folder at the specified path,
+        replacing any previous ones
+
+        :param image_data: Encoded image data of the folder icon
+        :param path: Absolute path to the folder
+        :raises OSError: The folder does not exist or cannot be written to
+        """
+        if not os.path.isdir(path):
+            raise NotADirectoryError("Not a folder: " + path)
+
+        _write_atomically(os.path.join(path, self.icon_filename), image_data)
+        _write_atomically(os.path.join(path, ".directory"),
+                          "[Desktop Entry]\nIcon=./{}\n".format(self.icon_filename).encode())
+
+
+class IconApplication(NamedTuple):
+    """Outcome of setting the icon of one folder, see apply_many"""
+    path: str
+    error: Optional[Exception]
+
+
+def default_icon_applier() -> IconApplier:
+    """The icon applier of the platform
+
+    :return: Native applier on macOS, filesystem stand-in otherwise
+    """
+    if sys.platform == "darwin":
+        return CocoaIconApplier()
+    return FilesystemIconApplier()
+
+
+# -----------------------------------------------------------------------------
+# Setting folder icons
+
+def set_folder_icon(pil_image: Image, path: str,
+                    applier: Optional[IconApplier] = None) -> None:
+    """Sets the icon of the file/directory at the specified path to the
+    provided image
+
+    :param pil_image: PIL Image of the folder icon to set
+    :param path: Absolute path to the folder
+    :param applier: Icon applier to use, the platform's one if None
+    """
+    applier = applier or default_icon_applier()
+    applier.apply(applier.encode(pil_image), path)
+
+
+def apply_many(pairs: Iterable[tuple[Image, str]],
+               applier: Optional[IconApplier] = None,
+               max_workers: int = ICON_APPLIER_THREADS) -> list[IconApplication]:
+    """Encodes and sets the icons of many folders, several at a time. A
+    folder that fails does not stop the others
+
+    :param pairs: Folder icons, and the absolute path of the folder to set
+        each one on
+    :param applier: Icon applier to use, the platform's one if None
+    :param max_workers: Largest number of folders handled at once
+    :return: Outcome for each folder, in the order given
+    """
+    applier = applier or default_icon_applier()
+
+    def apply_one(pair: tuple[Image, str]) -> IconApplication:
+        pil_image, path = pair
+        try:
+            applier.apply(applier.encode(pil_image), path)
+            return IconApplication(path, None)
+        except Exception as error:
+            return IconApplication(path, error)
+
+    # Encoding is mostly zlib, which releases the GIL, threads are enough
+    with ThreadPoolExecutor(max_workers) as executor:
+        return list(executor.map(apply_one, pairs))
+
+
+def _write_atomically(path: str, data: bytes | memoryview) -> None:
+    """Writes the file through a temporary one, so that it is never seen
+    partly written
+
+    :param path: Path of the file
+    :param data: Contents of the file
+    """
+    temporary_path = "{}.{}-{}.tmp".format(path, os.getpid(), threading.get_ident())
+    with open(temporary_path, "wb") as file:
+        file.write(data)
+    os.replace(temporary_path, path)
+
+
+def _cocoa_backend() -> tuple[ModuleType, ModuleType]:
+    """Imports the PyObjC modules, once per process
+
+    :return: The Cocoa and objc modules
+    :raises RuntimeError: PyObjC is not installed, i.e. not on macOS
+    """
+    try:
+        import Cocoa
+        import objc
+    except ImportError as error:
+        raise RuntimeError("Setting folder icons needs macOS and PyObjC") from error
+    return Cocoa, objc
@@ -0,0 +1,100 @@
+import struct
+from io import BytesIO
+
+from PIL import Image
+
+from fancyfolders.constants import IconEncoding
+from fancyfolders.imagetransformations import image_key
+from fancyfolders.rendercache import LRUCache
+
+# Arguments of Image.save for each single image encoding. The lowest PNG
+# compression level is several times faster, for files about a third larger
+SAVE_OPTIONS = {IconEncoding.PNG: {"format": "PNG"},
+                IconEncoding.PNG_FAST: {"format": "PNG", "compress_level": 1},
+                IconEncoding.TIFF: {"format": "TIFF", "compression": "raw"}}
+
+# Pixel sizes of a full iconset, largest first. Every size is resampled from
+# the one before it rather than from the largest, which is both faster and
+# keeps the small sizes sharp
+ICONSET_SIZES = (1024, 512, 256, 128, 64, 32, 16)
+
+# ICNS entry types of a full iconset (16 to 512 points, with @2x variants),
+# by their size in pixels. Entries of the same size share one PNG
+ICNS_ENTRY_SIZES = {b"icp4": 16, b"ic11": 32, b"icp5": 32, b"ic12": 64, b"icp6": 64,
+                    b"ic07": 128, b"ic13": 256, b"ic08": 256, b"ic14": 512,
+                    b"ic09": 512, b"ic10": 1024}
+
+# Size in bytes of the header of an ICNS file and of each entry: type, length
+ICNS_HEADER_SIZE = 8
+
+# Encoded ICNS files by the folder icon they were made from, so that saving
+# the same render again does not encode it again
+_icns_cache: LRUCache[bytes] = LRUCache(
+    "icns", max_entries=4, max_size=32 * 1024 * 1024, size_function=len)
+
+
+def encoded_folder_icon(image: Image.Image,
+                        encoding: IconEncoding = IconEncoding.PNG) -> bytes | memoryview:
+    """Encodes the folder icon in the format given. Single images are
+    returned as a view of the encoder's buffer, rather than a copy of it
+
+    :param image: PIL Image of the folder icon
+    :param encoding: Format to encode the folder icon in
+    :return: Encoded file data, read-only
+    """
+    if encoding is IconEncoding.ICNS:
+        return encoded_icns(image)
+
+    buffered = BytesIO()
+    image.save(buffered, **SAVE_OPTIONS[encoding])
+    return buffered.getbuffer().toreadonly()
+
+
+def icon_pyramid(image: Image.Image) -> dict[int, Image.Image]:
+    """Scales the folder icon to every size of an iconset, each from the next
+    larger one
+
+    :param image: Square PIL Image of the folder icon, usually 1024 pixels
+    :return: Square PIL Images by size in pixels
+    """
+    pyramid = {}
+    level = image
+    for size in ICONSET_SIZES:
+        if level.width != size:
+            level = level.resize((size, size), Image.LANCZOS)
+        pyramid[size] = level
+    return pyramid
+
+
+def encoded_icns(image: Image.Image) -> bytes:
+    """Encodes the folder icon as an ICNS file with a full iconset, from 16
+    to 1024 pixels. Cached for as long as the image exists, which must not be
+    modified afterwards
+
+    :param image: Square PIL Image of the folder icon
+    :return: ICNS file data
+    """
+    return _icns_cache.get_or_create(image_key(image), lambda: _encoded_icns(image))
+
+
+def _encoded_icns(image: Image.Image) -> bytes:
+    """Encodes the folder icon as an ICNS file, see encoded_icns
+
+    :param image: Square PIL Image of the folder icon
+    :return: ICNS file data
+    """
+    png_data = {}
+    for size, level in icon_pyramid(image).items():
+        buffered = BytesIO()
+        level.save(buffered, format="PNG")
+        png_data[size] = buffered.getvalue()
+
+    entries = [(entry_type, png_data[size]) for entry_type, size in ICNS_ENTRY_SIZES.items()]
+    table_of_contents = b"TOC " + struct.pack(">i", ICNS_HEADER_SIZE * (len(entries) + 1))
+    table_of_contents += b"".join(entry_type + struct.pack(">i", ICNS_HEADER_SIZE + len(data))
+                                  for entry_type, data in entries)
+    body = table_of_contents + b"".join(
+        entry_type + struct.pack(">i", ICNS_HEADER_SIZE + len(data)) + data
+        for entry_type, data in entries)
+
+    return b"icns" + struct.pack(">i", ICNS_HEADER_SIZE + len(body)) + body
@@ -0,0 +1,60 @@
+import math
+import os
+
+from PIL import Image
+
+from fancyfolders.imagetransformations import icon_downscale_ratio
+from fancyfolders.rendercache import LRUCache
+
+# Modes that Image.reduce supports, images in other modes are kept at their
+# full resolution
+REDUCIBLE_MODES = ("L", "RGB", "RGBA")
+
+# Decoded icon source images by (path, modification time, file size), so that
+# dropping the same file again reuses the image, and with it the icon mask
+_decoded_image_cache: LRUCache[Image.Image] = LRUCache("decoded_image", max_entries=8)
+
+
+def decoded_image_file(path: str) -> Image.Image:
+    """Decodes an image file to use as the icon, with only as many pixels
+    as the icon can ever be displayed with. Cached until the file changes
+
+    :param path: Path to the image file
+    :return: PIL Image, shared and read-only
+    :raises OSError: The file cannot be read, or is not an image
+    """
+    stat = os.stat(path)
+    return _decoded_image_cache.get_or_create(
+        (path, stat.st_mtime_ns, stat.st_size), lambda: _decoded_image_file(path))
+
+
+def reduced_icon_image(image: Image.Image) -> Image.Image:
+    """Reduces an already decoded image to use as the icon, by the largest
+    integer factor that keeps at least as many pixels as the icon mask is
+    made from, so that the final resize still has room to filter
+
+    :param image: PIL Image
+    :return: The reduced PIL Image, or the image itself if it is small enough
+    """
+    factor = int(1 / icon_downscale_ratio(image.size))
+    if factor <= 1 or image.mode not in REDUCIBLE_MODES:
+        return image
+    return image.reduce(factor)
+
+
+def _decoded_image_file(path: str) -> Image.Image:
+    """Decodes an image file, see decoded_image_file
+
+    :param path: Path to the image file
+    :return: PIL Image
+    """
+    with Image.open(path) as image:
+        # JPEG files can be decoded at 1/2, 1/4 or 1/8 scale directly, which
+        # skips most of the inverse DCT and never holds the full size photo
+        # in memory. Other formats are reduced once decoded
+        ratio = icon_downscale_ratio(image.size)
+        if ratio < 0.5:
+            image.draft(image.mode, (math.ceil(image.width * ratio),
+                                     math.ceil(image.height * ratio)))
+        image.load()
+        return reduced_icon_image(image)
@@ -1,23 +1,94 @@
+import itertools
 import math
+import os
+import time
+import weakref
 from colorsys import hsv_to_rgb, rgb_to_hsv
-from typing import Callable, cast
+from typing import Callable, NamedTuple, Optional, TypeVar, cast
 
 from PIL import ImageFont, ImageDraw, ImageFilter, ImageChops, Image
 
 from fancyfolders.constants import (
-    ICON_BOX_SCALING_FACTOR, FOLDER_SHADOW_INCREASE_FACTOR,
-    INNER_SHADOW_BLUR, INNER_SHADOW_COLOUR_SCALING_FACTOR, INNER_SHADOW_Y_OFFSET,
-    OUTER_HIGHLIGHT_BLUR, OUTER_HIGHLIGHT_Y_OFFSET, FolderStyle, IconGenerationMethod, SFFont)
+    FILTER_TILE_HEIGHT, GLYPH_CACHE_BUDGET, ICON_BOX_SCALING_FACTOR,
+    FOLDER_SHADOW_INCREASE_FACTOR, MAXIMUM_ICON_SCALE_VALUE,
+    ICON_MASK_OVERSAMPLING, INNER_SHADOW_BLUR, INNER_SHADOW_COLOUR_SCALING_FACTOR,
+    INNER_SHADOW_Y_OFFSET, OUTER_HIGHLIGHT_BLUR, OUTER_HIGHLIGHT_Y_OFFSET, FolderStyle,
+    IconGenerationMethod, RenderEngine, SFFont, TintColour)
+from fancyfolders.rendercache import CacheStats, LRUCache
 from fancyfolders.utilities import (
     clamp, divided_colour,
     hsv_to_rgb_int, internal_resource_path, rgb_int_to_hsv, get_internal_font_location)
 
+T = TypeVar("T")
+
+# Decoded base folder images with the increased shadow already applied,
+# at the full asset size and at recently used preview resolutions
+_base_folder_cache: LRUCache[Image.Image] = LRUCache(
+    "base_folder", max_entries=3 * len(FolderStyle))
+
+# Tint lookup tables by (base colour, tint colour). The palette colours of
+# every folder style are kept apart from custom colours, so that dragging
+# across the colour dialog does not evict the prewarmed palette
+_tint_lut_cache: LRUCache[ImageFilter.Color3DLUT] = LRUCache(
+    "tint_lut", max_entries=len(FolderStyle) * len(TintColour))
+_custom_tint_lut_cache: LRUCache[ImageFilter.Color3DLUT] = LRUCache(
+    "custom_tint_lut", max_entries=16)
+_palette_tint_colours = frozenset(tint_colour.value for tint_colour in TintColour)
+
+# FreeType font handles by (font style, pixel size)
+_font_cache: LRUCache[ImageFont.FreeTypeFont] = LRUCache(
+    "font", max_entries=2 * len(SFFont))
+
+# Rasterized glyphs by (character, font style, pixel size), text masks are
+# composited from them so that typing only rasterizes new characters
+_glyph_cache: LRUCache["TextGlyph"] = LRUCache(
+    "glyph", max_entries=1024, max_size=GLYPH_CACHE_BUDGET,
+    size_function=lambda glyph: glyph.mask.width * glyph.mask.height)
+
+# Kerning between two characters by (pair, font style, pixel size)
+_kerning_cache: LRUCache[float] = LRUCache("kerning", max_entries=4096)
+
+# Drawing context only used to measure text, it is never drawn on
+_text_measuring_draw = ImageDraw.Draw(Image.new("L", (0, 0)))
+
+# Folder generation stages, see generate_folder_icon for the keys of each.
+# Holds enough text masks to go back and forth while typing, or across all
+# the font weights with the thickness slider
+_icon_mask_cache: LRUCache[Image.Image] = LRUCache(
+    "icon_mask", max_entries=4 * len(SFFont))
+_fitted_mask_cache: LRUCache[tuple[Image.Image, tuple[int, int, int, int]]] = LRUCache(
+    "fitted_mask", max_entries=16)
+_untinted_folder_cache: LRUCache[Image.Image] = LRUCache(
+    "untinted_folder", max_entries=8)
+_tinted_folder_cache: LRUCache[Image.Image] = LRUCache(
+    "tinted_folder", max_entries=8)
+
+# Unique keys of icon source images (which are not hashable) by their id
+_image_keys: dict[int, tuple[weakref.ref, int]] = {}
+_image_key_counter = itertools.count()
+
+
+class TaskExitedException(Exception):
+    """Raised by the folder generation when it is asked to stop"""
+
+
+class TextGlyph(NamedTuple):
+    """A character rasterized on its own, see _text_glyph"""
+    mask: Image.Image
+    # Box of the mask relative to the pen position on the baseline: x1, y1, x2, y2
+    box: tuple[int, int, int, int]
+    # Distance to the pen position of the next character in pixels
+    advance: float
+
 
 def generate_folder_icon(folder_style: FolderStyle = FolderStyle.big_sur_light,
                          generation_method: IconGenerationMethod = IconGenerationMethod.NONE,
                          icon_scale=1.0, tint_colour: tuple[int, int, int] = None,
                          text: str = None, font_style=SFFont.heavy, image: Image.Image = None,
-                         keep_going: Callable[[], bool] = lambda: True) -> Image.Image:
+                         resolution: Optional[int] = None,
+                         engine: RenderEngine = RenderEngine.PIL,
+                         keep_going: Callable[[], bool] = lambda: True,
+                         stage_timings: Optional[dict[str, float]] = None) -> Image.Image:
     """Generates a folder icon image based on the given parameters.
 
     Returns a PIL Image file representing the folder icon. This function takes
@@ -25,6 +96,9 @@ def generate_folder_icon(folder_style: FolderStyle = FolderStyle.big_sur_light,
     whether the execution should continue, will throw a TaskExitedException
     if this callback function returns false.
 
+    Intermediate and final images are cached, the returned image may be
+    shared with other calls and must not be modified in place.
+
 
     :param folder_style: The macOS folder style
     :param generation_method: Whether to generate the folder without any icon,
@@ -34,67 +108,195 @@ def generate_folder_icon(folder_style: FolderStyle = FolderStyle.big_sur_light,
     :param text: Text or symbol to use as the icon
     :param font_style:
     :param image: Dragged image to use as the icon
+    :param resolution: Size in pixels of the generated folder icon, defaults
+        to the full size of the folder style. Smaller values are much faster,
+        i.e. for previews
+    :param engine: Implementation used to composite the icon onto the folder
     :param keep_going:
+    :param stage_timings: If given, the time in seconds spent in each stage
+        (including cache lookups) is added to it by stage name
     :return: The PIL Image
     :raises TaskExitedException: The worker is requesting to cancel this method.
     """
 
-    from fancyfolders.threadsafefoldergeneration import TaskExitedException
-
     def exit_check() -> None:
         """Exits the folder generation if requested externally"""
         if not keep_going():
             raise TaskExitedException
 
-    # -------------------------------------------------------------------------
-    # Get base folder image and its size
-    folder_image = Image.open(internal_resource_path(
-        "assets/" + folder_style.filename()))
-    size = folder_style.size()
-    exit_check()
+    def run_stage(stage: str, function: Callable[[], T]) -> T:
+        """Runs a stage of the folder generation, timing it if requested"""
+        if stage_timings is None:
+            return function()
+        start_time = time.perf_counter()
+        try:
+            return function()
+        finally:
+            stage_timings[stage] = stage_timings.get(stage, 0.0) + \
+                time.perf_counter() - start_time
 
     # -------------------------------------------------------------------------
-    # Darken shadow to match default macOS folders
-    folder_image = _increased_shadow(
-        folder_image, factor=FOLDER_SHADOW_INCREASE_FACTOR)
+    # Get base folder image (with darkened shadow) at the target size
+    size = resolution or folder_style.size()
+    folder_image = run_stage(
+        "base_folder", lambda: base_folder_image(folder_style, size))
     exit_check()
 
     # -------------------------------------------------------------------------
-    # Generate mask image based on icon generation method
-    mask_image = None
+    # The folder is generated in stages, each one cached by its inputs, so
+    # that i.e. changing only the tint reuses the untinted folder and changing
+    # only the scale reuses the icon mask
     if generation_method is IconGenerationMethod.NONE:
-        if tint_colour is None:
-            return folder_image
-        return adjusted_colours(folder_image, folder_style.base_colour(), tint_colour)
-    elif generation_method is IconGenerationMethod.IMAGE:
-        mask_image = _generate_mask_from_image(image)
-    elif generation_method is IconGenerationMethod.TEXT:
-        mask_image = _generate_mask_from_text(text, size, font_style)
+        untinted_key = (folder_style, size)
+        untinted_image = folder_image
+    else:
+        # Icon mask, depends only on the icon source
+        if generation_method is IconGenerationMethod.IMAGE:
+            mask_key = (generation_method, image_key(image))
+            mask_image = run_stage("icon_mask", lambda: _icon_mask_cache.get_or_create(
+                mask_key, lambda: _generate_mask_from_image(image, exit_check)))
+        else:
+            mask_key = (generation_method, text, font_style, size)
+            mask_image = run_stage("icon_mask", lambda: _icon_mask_cache.get_or_create(
+                mask_key, lambda: _generate_mask_from_text(text, size, font_style)))
+        exit_check()
+
+        # Icon mask fitted into the scaled bounding box
+        fitted_key = (mask_key, icon_scale, size)
+        fitted_mask = run_stage("fitted_mask", lambda: _fitted_mask_cache.get_or_create(
+            fitted_key, lambda: _fitted_icon_mask(mask_image, icon_scale, size)))
+        exit_check()
+
+        # Folder with the icon composited onto it
+        untinted_key = (folder_style, fitted_key, engine)
+        untinted_image = run_stage("untinted_folder", lambda: _untinted_folder_cache.get_or_create(
+            untinted_key, lambda: _composited_folder(
+                folder_style, folder_image, *fitted_mask, engine, exit_check)))
     exit_check()
 
     # -------------------------------------------------------------------------
-    # Bounding box to place icon
+    # Apply tint colour if specified, return result
+    if tint_colour is None:
+        return untinted_image
+    return run_stage("tinted_folder", lambda: _tinted_folder_cache.get_or_create(
+        (untinted_key, tuple(tint_colour)), lambda: adjusted_colours(
+            untinted_image, folder_style.base_colour(), tint_colour, exit_check)))
+
+
+def render_stage_stats() -> dict[str, CacheStats]:
+    """Returns the usage counters of the cache of each folder generation stage
+
+    :return: Mapping of stage name to its cache stats
+    """
+    return {cache.name: cache.stats() for cache in (
+        _icon_mask_cache, _fitted_mask_cache,
+        _untinted_folder_cache, _tinted_folder_cache)}
+
+
+def image_key(image: Image.Image) -> int:
+    """Returns a key that is unique to the image object for as long as the
+    process runs, unlike its id which may be reused once it is deleted
+
+    :param image: PIL Image
+    :return: Unique key
+    """
+    entry = _image_keys.get(id(image))
+    if entry is None or entry[0]() is not image:
+        # Forget images that no longer exist before adding a new one
+        for image_id, (image_ref, _) in list(_image_keys.items()):
+            if image_ref() is None:
+                _image_keys.pop(image_id, None)
+
+        entry = (weakref.ref(image), next(_image_key_counter))
+        _image_keys[id(image)] = entry
+    return entry[1]
+
+
+def _fitted_icon_mask(mask_image: Image.Image, icon_scale: float, size: int) \
+        -> tuple[Image.Image, tuple[int, int, int, int]]:
+    """Scales the icon mask to fit in the bounding box of the icon
+
+    :param mask_image: PIL Image (L) mask of the icon
+    :param icon_scale: Scale of the icon relative to the bounding box
+    :param size: Size of the folder in pixels
+    :return: Scaled PIL Image (L) mask, Box to paste it into: x1, y1, x2, y2
+    """
+    return _resize_image_in_box(mask_image, icon_bounding_box(icon_scale, size))
+
+
+def icon_bounding_box(icon_scale: float, size: int) -> tuple[int, int, int, int]:
+    """Returns the box in which the icon is placed on the folder
+
+    :param icon_scale: Scale of the icon relative to the default box
+    :param size: Size of the folder in pixels
+    :return: Bounding box: x1, y1, x2, y2
+    """
     bounding_box_percentages = (0.086, 0.29, 0.914, 0.777)
     bounding_box = cast(
         tuple[int, int, int, int],
         tuple(int(size * percent) for percent in bounding_box_percentages))
-    new_bounding_box = scaled_box(
+    return scaled_box(
         bounding_box, icon_scale * ICON_BOX_SCALING_FACTOR, (size, size))
-    exit_check()
+
+
+def icon_downscale_ratio(image_size: tuple[int, int]) -> float:
+    """Returns the ratio by which an icon source image can be downscaled
+    without losing detail, i.e. to fit the icon box at the maximum icon scale
+    on the largest folder, oversampled so that normalising the mask sees the
+    same fine detail as at full resolution
+
+    :param image_size: Size of the icon source image (width, height)
+    :return: Ratio, 1 or more if the image should not be downscaled
+    """
+    largest_size = max(folder_style.size() for folder_style in FolderStyle)
+    x1, y1, x2, y2 = icon_bounding_box(MAXIMUM_ICON_SCALE_VALUE, largest_size)
+    return ICON_MASK_OVERSAMPLING * min(
+        (x2 - x1) / image_size[0], (y2 - y1) / image_size[1])
+
+
+def _composited_folder(folder_style: FolderStyle, folder_image: Image.Image,
+                       scaled_mask: Image.Image, paste_box: tuple[int, int, int, int],
+                       engine: RenderEngine, exit_check: Callable[[], None]) -> Image.Image:
+    """Composites the fitted icon mask onto the folder, as an inner shadow and
+    an outer highlight, without any tint
+
+    :param folder_style: The macOS folder style
+    :param folder_image: PIL Image (RGBA) of the base folder
+    :param scaled_mask: PIL Image (L) mask of the icon, fitted to the box
+    :param paste_box: Box to paste the mask into: x1, y1, x2, y2
+    :param engine: Implementation used to composite the icon onto the folder
+    :param exit_check: Raises TaskExitedException if requested externally
+    :return: New PIL Image (RGBA)
+    """
+    size = folder_image.width
+
+    # Blur radii are defined for the full size folder, scale them down with it
+    resolution_scale = size / folder_style.size()
 
     # -------------------------------------------------------------------------
-    # Fit the icon mask within the bounding box
-    formatted_mask = Image.new("L", (size, size), "black")
-    scaled_image, paste_box = _resize_image_in_box(
-        mask_image, new_bounding_box)
-    formatted_mask.paste(scaled_image, paste_box, scaled_image)
+    # Region of the folder affected by the icon, i.e. the icon padded by the
+    # reach of the blurs and offsets. All effects are computed within it only
+    shadow_blur = INNER_SHADOW_BLUR * resolution_scale
+    shadow_offset = math.floor(size * INNER_SHADOW_Y_OFFSET)
+    highlight_blur = OUTER_HIGHLIGHT_BLUR * resolution_scale
+    highlight_offset = math.floor(size * OUTER_HIGHLIGHT_Y_OFFSET)
+
+    effect_padding = max(blur_reach(shadow_blur) + shadow_offset,
+                         blur_reach(highlight_blur) + highlight_offset)
+    region = padded_box(paste_box, effect_padding, (size, size))
+
+    # -------------------------------------------------------------------------
+    # Place the icon mask within the bounding box, relative to the region
+    formatted_mask = Image.new(
+        "L", (region[2] - region[0], region[3] - region[1]), "black")
+    formatted_mask.paste(scaled_mask, (paste_box[0] - region[0],
+                                       paste_box[1] - region[1]), scaled_mask)
     exit_check()
 
     # -------------------------------------------------------------------------
     # Generate the center colour to be a desired colour after the multiply filter
     center_colour = divided_colour(
         folder_style.base_colour(), folder_style.icon_colour())
-    exit_check()
 
     # -------------------------------------------------------------------------
     # Calculate shadow colour to be slightly darker than the center colour
@@ -104,23 +306,59 @@ def generate_folder_icon(folder_style: FolderStyle = FolderStyle.big_sur_light,
     shadow_colour = hsv_to_rgb_int(shadow_hsv_colour)
     exit_check()
 
+    # -------------------------------------------------------------------------
+    # Composite the inner shadow and outer highlight of the icon onto the folder
+    composite_icon = _composite_icon
+    if engine is RenderEngine.NUMPY:
+        from fancyfolders.numpycompositing import composite_icon
+    icon_region = composite_icon(
+        folder_image.crop(region), formatted_mask, center_colour, shadow_colour,
+        shadow_blur, shadow_offset, highlight_blur, highlight_offset, exit_check)
+    exit_check()
+
+    result = folder_image.copy()
+    result.paste(icon_region, region[0:2])
+    return result
+
+
+def _composite_icon(folder_image: Image.Image, mask: Image.Image,
+                    center_colour: tuple[int, int, int],
+                    shadow_colour: tuple[int, int, int],
+                    shadow_blur: float, shadow_offset: int,
+                    highlight_blur: float, highlight_offset: int,
+                    exit_check: Callable[[], None]) -> Image.Image:
+    """Composites the icon onto the folder with PIL operations, as an inner
+    shadow (multiplied) and an outer highlight (added) below it.
+
+    :param folder_image: PIL Image (RGBA) of the base folder
+    :param mask: PIL Image (L) mask of the icon, same size as the folder image
+    :param center_colour: Colour of the icon before the multiply filter
+    :param shadow_colour: Colour of the inner shadow around the icon edges
+    :param shadow_blur: Blur radius of the inner shadow in pixels
+    :param shadow_offset: Vertical offset of the inner shadow in pixels
+    :param highlight_blur: Blur radius of the outer highlight in pixels
+    :param highlight_offset: Vertical offset of the outer highlight in pixels
+    :param exit_check: Raises TaskExitedException if requested externally
+    :return: PIL Image (RGBA)
+    """
+
     # -------------------------------------------------------------------------
     # Create shadow insert image
     shadow_image = Image.composite(
-        Image.new("RGB", formatted_mask.size, center_colour),
-        Image.new("RGB", formatted_mask.size, shadow_colour),
-        formatted_mask)
+        Image.new("RGB", mask.size, center_colour),
+        Image.new("RGB", mask.size, shadow_colour),
+        mask)
     exit_check()
 
-    shadow_image = shadow_image.filter(
-        ImageFilter.GaussianBlur(INNER_SHADOW_BLUR))
+    shadow_image = apply_in_tiles(
+        shadow_image, lambda tile: tile.filter(ImageFilter.GaussianBlur(shadow_blur)),
+        exit_check, overlap=blur_reach(shadow_blur))
 
     exit_check()
-    shadow_image = ImageChops.offset(
-        shadow_image, 0, math.floor(size * INNER_SHADOW_Y_OFFSET))
+    shadow_image = ImageChops.offset(shadow_image, 0, shadow_offset)
 
     exit_check()
-    shadow_image.putalpha(formatted_mask)
+    shadow_image.putalpha(mask)
     shadow_insert = ImageChops.multiply(folder_image, shadow_image)
 
     exit_check()
@@ -128,17 +366,17 @@ def generate_folder_icon(folder_style: FolderStyle = FolderStyle.big_sur_light,
     # -------------------------------------------------------------------------
     # Create highlight insert image
     highlight_image = Image.composite(
-        Image.new("RGBA", formatted_mask.size, "#131313"),
-        Image.new("RGBA", formatted_mask.size, "black"),
-        formatted_mask)
+        Image.new("RGBA", mask.size, "#131313"),
+        Image.new("RGBA", mask.size, "black"),
+        mask)
     exit_check()
 
-    highlight_image = highlight_image.filter(
-        ImageFilter.GaussianBlur(OUTER_HIGHLIGHT_BLUR))
+    highlight_image = apply_in_tiles(
+        highlight_image, lambda tile: tile.filter(ImageFilter.GaussianBlur(highlight_blur)),
+        exit_check, overlap=blur_reach(highlight_blur))
     exit_check()
 
-    highlight_image = ImageChops.offset(
-        highlight_image, 0, math.floor(size * OUTER_HIGHLIGHT_Y_OFFSET))
+    highlight_image = ImageChops.offset(highlight_image, 0, highlight_offset)
     exit_check()
 
     highlight_image.putalpha(0)
@@ -147,18 +385,44 @@ def generate_folder_icon(folder_style: FolderStyle = FolderStyle.big_sur_light,
 
     # -------------------------------------------------------------------------
     # Combine the two
-    result = Image.alpha_composite(highlight_insert, shadow_insert)
-    exit_check()
+    return Image.alpha_composite(highlight_insert, shadow_insert)
 
-    # -------------------------------------------------------------------------
-    # Apply tint colour if specified, return result
-    if tint_colour is None:
-        return result
-    return adjusted_colours(result, folder_style.base_colour(), tint_colour)
+
+def base_folder_image(folder_style: FolderStyle,
+                      size: Optional[int] = None) -> Image.Image:
+    """Returns the decoded base folder image for the style, with the shadow
+    darkened to match default macOS folders.
+
+    The image is loaded once per style and size and shared by every render,
+    so it must not be modified in place. Every PIL operation used by the
+    folder generation returns a new image, copy it first otherwise.
+
+    :param folder_style: The macOS folder style
+    :param size: Size in pixels, defaults to the full size of the style
+    :return: PIL Image (RGBA), shared and read-only
+    """
+    full_size = folder_style.size()
+    size = size or full_size
+
+    def load_base_folder_image() -> Image.Image:
+        if size != full_size:
+            return base_folder_image(folder_style).resize(
+                (size, size), Image.LANCZOS)
+
+        with Image.open(internal_resource_path(
+                "assets/" + folder_style.filename())) as folder_image:
+            folder_image.load()
+            return _increased_shadow(
+                folder_image, factor=FOLDER_SHADOW_INCREASE_FACTOR)
+
+    return _base_folder_cache.get_or_create(
+        (folder_style, size), load_base_folder_image)
 
 
 def _generate_mask_from_text(text, image_size, font_style=SFFont.heavy):
     """Generates an image mask from the specified text and font parameters.
+    A single line of text is composited from cached glyphs, so that typing
+    a character only rasterizes that character, if it was never used before
 
     :param text: Text to display
     :param image_size: Size of the image in pixels
@@ -171,11 +435,24 @@ def _generate_mask_from_text(text, image_size, font_style=SFFont.heavy):
     #  add text aligning
     #  add letter size independent mode (lowercase letters not same height as uppercase)
 
-    font_filepath = get_internal_font_location(font_style.filename())
-    assert font_filepath is not None
+    font = sf_font(font_style, int(image_size / 2))
+
+    # Glyphs can only be placed on their own if each character is one glyph,
+    # which isn't the case with the text shaping of the Raqm layout engine
+    if "\n" in text or font.layout_engine != ImageFont.Layout.BASIC:
+        return _rasterized_text_mask(text, image_size, font)
+    return _composited_text_mask(text, font_style, font)
 
-    font = ImageFont.truetype(font_filepath, int(image_size / 2))
 
+def _rasterized_text_mask(text: str, image_size: int,
+                          font: ImageFont.FreeTypeFont) -> Image.Image:
+    """Generates the text mask by drawing the whole text at once
+
+    :param text: Text to display
+    :param image_size: Size of the image in pixels
+    :param font: Font to use
+    :return: PIL Image (L) mask, white subject on black background
+    """
     text_draw_options = {
         "text": text,
         "anchor": "mm",
@@ -186,8 +463,7 @@ def _generate_mask_from_text(text, image_size, font_style=SFFont.heavy):
 
     # Determine the exact size of the temporary image necessary to draw the complete
     # text with the specified options, avoids an unnecessarily large buffer image
-    temp_draw = ImageDraw.Draw(Image.new("L", (0, 0)))
-    text_bbox = temp_draw.textbbox((0, 0), **text_draw_options)
+    text_bbox = _text_measuring_draw.textbbox((0, 0), **text_draw_options)
     text_size = (text_bbox[2] + abs(text_bbox[0]),
                  text_bbox[3] + abs(text_bbox[1]))
     text_center = (abs(text_bbox[0]), abs(text_bbox[1]))
@@ -199,30 +475,255 @@ def _generate_mask_from_text(text, image_size, font_style=SFFont.heavy):
     return text_image
 
 
-def _generate_mask_from_image(image: Image.Image) -> Image.Image:
+def _composited_text_mask(text: str, font_style: SFFont,
+                          font: ImageFont.FreeTypeFont) -> Image.Image:
+    """Generates the text mask by compositing the glyph of each character,
+    the same mask as _rasterized_text_mask gives for a single line of text
+
+    :param text: Single line of text to display
+    :param font_style: Font weight of the font
+    :param font: Font to use
+    :return: PIL Image (L) mask, white subject on black background
+    """
+    glyphs = [_text_glyph(character, font_style, font) for character in text]
+    if not glyphs:
+        # Nothing to draw, like _rasterized_text_mask gives for no text
+        return Image.new("L", (0, 0))
+
+    # Pen position of each glyph along the baseline, in fractional pixels
+    pen_positions = []
+    pen_position = 0.0
+    for index, glyph in enumerate(glyphs):
+        if index > 0:
+            pen_position += _text_kerning(text[index - 1], text[index], font_style, font)
+        pen_positions.append(pen_position)
+        pen_position += glyph.advance
+
+    # Boxes of the glyphs relative to the middle of the text (the "mm"
+    # anchor), where FreeType rounds each pen position to whole pixels
+    origin_x = -_freetype_round(pen_position / 2)
+    ascent, descent = font.getmetrics()
+    origin_y = _freetype_round((ascent - descent) / 2)
+    glyph_boxes = [(origin_x + _freetype_round(position) + glyph.box[0],
+                    origin_y + glyph.box[1],
+                    origin_x + _freetype_round(position) + glyph.box[2],
+                    origin_y + glyph.box[3])
+                   for glyph, position in zip(glyphs, pen_positions)]
+    text_bbox = (min(box[0] for box in glyph_boxes), min(box[1] for box in glyph_boxes),
+                 max(box[2] for box in glyph_boxes), max(box[3] for box in glyph_boxes))
+
+    # Same buffer size and text position as _rasterized_text_mask
+    text_image = Image.new("L", (text_bbox[2] + abs(text_bbox[0]),
+                                 text_bbox[3] + abs(text_bbox[1])))
+    center_x, center_y = abs(text_bbox[0]), abs(text_bbox[1])
+
+    for glyph, box in zip(glyphs, glyph_boxes):
+        if glyph.mask.width == 0 or glyph.mask.height == 0:
+            continue
+        paste_box = (box[0] + center_x, box[1] + center_y,
+                     box[2] + center_x, box[3] + center_y)
+        # Overlapping glyphs keep the brighter pixel, as FreeType draws them
+        text_image.paste(ImageChops.lighter(text_image.crop(paste_box), glyph.mask),
+                         paste_box)
+
+    return text_image
+
+
+def _text_glyph(character: str, font_style: SFFont,
+                font: ImageFont.FreeTypeFont) -> TextGlyph:
+    """Returns the character rasterized on its own, rasterized once per font
+    weight and size and then cached
+
+    :param character: Character to rasterize
+    :param font_style: Font weight of the font
+    :param font: Font to use
+    :return: Glyph mask, its box relative to the pen position, and its advance
+    """
+    def rasterize_glyph() -> TextGlyph:
+        box = font.getbbox(character, anchor="ls")
+        mask = Image.new("L", (box[2] - box[0], box[3] - box[1]))
+        ImageDraw.Draw(mask).text(
+            (-box[0], -box[1]), character, font=font, anchor="ls", fill="white")
+        return TextGlyph(mask, box, font.getlength(character))
+
+    return _glyph_cache.get_or_create((character, font_style, font.size), rasterize_glyph)
+
+
+def _text_kerning(first: str, second: str, font_style: SFFont,
+                  font: ImageFont.FreeTypeFont) -> float:
+    """Returns the adjustment of the distance between two characters next to
+    each other, measured once per font weight and size and then cached
+
+    :param first: Character on the left
+    :param second: Character on the right
+    :param font_style: Font weight of the font
+    :param font: Font to use
+    :return: Kerning in fractional pixels, 0 for most pairs
+    """
+    pair = first + second
+    return _kerning_cache.get_or_create((pair, font_style, font.size), lambda: (
+        font.getlength(pair) - font.getlength(first) - font.getlength(second)))
+
+
+def _freetype_round(value: float) -> int:
+    """Rounds fractional pixels to whole pixels the way FreeType does, with
+    halves rounded up rather than to even
+
+    :param value: Fractional pixels
+    :return: Whole pixels
+    """
+    return math.floor(value + 0.5)
+
+
+def sf_font(font_style: SFFont, size: int) -> ImageFont.FreeTypeFont:
+    """Returns the font handle of the SF font weight at the pixel size. The
+    font file is only parsed once per weight and size
+
+    :param font_style: Font weight
+    :param size: Font size in pixels
+    :return: PIL FreeType font
+    """
+    def load_font() -> ImageFont.FreeTypeFont:
+        font_filepath = get_internal_font_location(font_style.filename())
+        assert font_filepath is not None
+        return ImageFont.truetype(font_filepath, size)
+
+    return _font_cache.get_or_create((font_style, size), load_font)
+
+
+def _generate_mask_from_image(image: Image.Image,
+                              exit_check: Callable[[], None] = lambda: None) -> Image.Image:
     """Generates an image mask from the specified PIL image.
 
     :param image: PIL image (RGB / RGBA) to display
+    :param exit_check: Raises TaskExitedException if requested externally
     :return: PIL Image (L) mask, white subject on black background
     """
-    white_background = Image.new("L", image.size, "white")
-    mask = image if image.mode in ["RGBA", "RGBa"] else None
-    white_background.paste(image, mask)
-    white_background = _normalized_image(white_background)
+    def on_white_background(tile: Image.Image) -> Image.Image:
+        white_background_tile = Image.new("L", tile.size, "white")
+        mask = tile if tile.mode in ["RGBA", "RGBa"] else None
+        white_background_tile.paste(tile, mask)
+        return white_background_tile
+
+    white_background = apply_in_tiles(image, on_white_background, exit_check)
+
+    # Normalised at full resolution, resampling hard edges rings past their
+    # darkest and lightest values, which would change the extrema
+    exit_check()
+    white_background = _normalized_image(white_background, exit_check=exit_check)
+
+    # Only keep a few times as many pixels as the icon can ever be displayed
+    # with, large photos would otherwise be resized at their full resolution
+    downscale_ratio = icon_downscale_ratio(image.size)
+    if downscale_ratio < 1:
+        white_background = _downscaled_in_tiles(
+            white_background, (math.ceil(image.width * downscale_ratio),
+                               math.ceil(image.height * downscale_ratio)),
+            exit_check)
 
     return ImageChops.invert(white_background)
 
 
+def _downscaled_in_tiles(image: Image.Image, size: tuple[int, int],
+                         exit_check: Callable[[], None]) -> Image.Image:
+    """Downscales the image like Image.resize with LANCZOS and a reducing gap
+    of 2.0, but band by band, so that downscaling a large image can be
+    cancelled. Gives the same result, within rounding of single pixels.
+
+    :param image: PIL Image (L)
+    :param size: New size of the image (width, height)
+    :param exit_check: Raises TaskExitedException if requested externally
+    :return: New PIL Image
+    """
+    # First reduce by the integer factor, by averaging blocks of pixels
+    factor_x = int(image.width / size[0] / 2.0) or 1
+    factor_y = int(image.height / size[1] / 2.0) or 1
+    box = (0, 0, image.width / factor_x, image.height / factor_y)
+    if factor_x > 1 or factor_y > 1:
+        reduced_image = Image.new(image.mode, (math.ceil(box[2]), math.ceil(box[3])))
+        band_height = FILTER_TILE_HEIGHT * factor_y
+        for top in range(0, image.height, band_height):
+            exit_check()
+            band = image.crop((0, top, image.width, min(top + band_height, image.height)))
+            reduced_image.paste(band.reduce((factor_x, factor_y)), (0, top // factor_y))
+        image = reduced_image
+
+    # Then resample the rest of the way, the filter of each band of rows
+    # still reaches the source rows outside of its box
+    resized_image = Image.new(image.mode, size)
+    scale_y = box[3] / size[1]
+    for top in range(0, size[1], FILTER_TILE_HEIGHT):
+        exit_check()
+        bottom = min(top + FILTER_TILE_HEIGHT, size[1])
+        resized_image.paste(image.resize(
+            (size[0], bottom - top), Image.LANCZOS,
+            box=(0, top * scale_y, box[2], bottom * scale_y)), (0, top))
+    return resized_image
+
+
 def adjusted_colours(image: Image.Image, base_colour: tuple[int, int, int],
-                     tint_colour: tuple[int, int, int]) -> Image.Image:
+                     tint_colour: tuple[int, int, int],
+                     exit_check: Callable[[], None] = lambda: None) -> Image.Image:
     """Changes the colours across the specified image by an amount that would
     shift the 'base colour' to the 'tint colour.'
 
     :param image: PIL Image (RGB/RGBA)
     :param base_colour: Starting base colour
     :param tint_colour: Final tint colour
+    :param exit_check: Raises TaskExitedException if requested externally
     :return: PIL Image (RGB/RGBA)
     """
+    colour_lut = tint_lut(base_colour, tint_colour)
+    return apply_in_tiles(image, lambda tile: tile.filter(colour_lut), exit_check)
+
+
+def tint_lut(base_colour: tuple[int, int, int],
+             tint_colour: tuple[int, int, int]) -> ImageFilter.Color3DLUT:
+    """Returns the colour lookup table that shifts the 'base colour' to the
+    'tint colour,' built once and then cached.
+
+    :param base_colour: Starting base colour
+    :param tint_colour: Final tint colour
+    :return: PIL Color3DLUT filter
+    """
+    key = (tuple(base_colour), tuple(tint_colour))
+    cache = _tint_lut_cache if key[1] in _palette_tint_colours else _custom_tint_lut_cache
+    return cache.get_or_create(key, lambda: _generate_tint_lut(base_colour, tint_colour))
+
+
+def prewarm_tint_luts() -> None:
+    """Builds the tint lookup tables for every palette colour of every folder
+    style ahead of time, i.e. in the background at startup
+    """
+    for folder_style in FolderStyle:
+        for tint_colour in TintColour:
+            tint_lut(folder_style.base_colour(), tint_colour.value)
+
+
+def prewarm_render_caches() -> None:
+    """Prepares for fast folder generation, i.e. in a new worker process:
+    renders an empty folder of every style, which loads the base folders,
+    and loads the tint lookup tables of the palette and the font handles of
+    full size text icons
+    """
+    prewarm_tint_luts()
+    for folder_style in FolderStyle:
+        generate_folder_icon(folder_style)
+        for font_style in SFFont:
+            if os.path.exists(get_internal_font_location(font_style.filename())):
+                # Text icons use half the folder size as the font size
+                sf_font(font_style, int(folder_style.size() / 2))
+
+
+def _generate_tint_lut(base_colour: tuple[int, int, int],
+                       tint_colour: tuple[int, int, int]) -> ImageFilter.Color3DLUT:
+    """Generates the colour lookup table that shifts the 'base colour' to the
+    'tint colour' in HSV space.
+
+    :param base_colour: Starting base colour
+    :param tint_colour: Final tint colour
+    :return: PIL Color3DLUT filter
+    """
     start_hue, start_sat, start_val = rgb_int_to_hsv(base_colour)
     final_hue, final_sat, final_val = rgb_int_to_hsv(tint_colour)
 
@@ -244,7 +745,7 @@ def adjusted_colours(image: Image.Image, base_colour: tuple[int, int, int],
 
         return hsv_to_rgb(h, s, v)
 
-    return image.filter(ImageFilter.Color3DLUT.generate(4, adjust_pixel_colour, 3))
+    return ImageFilter.Color3DLUT.generate(4, adjust_pixel_colour, 3)
 
 
 def _increased_shadow(folder_image, factor) -> Image.Image:
@@ -261,7 +762,8 @@ def _increased_shadow(folder_image, factor) -> Image.Image:
     return Image.merge("RGBA", (r, g, b, a))
 
 
-def _normalized_image(image: Image.Image, steepness=0.18) -> Image.Image:
+def _normalized_image(image: Image.Image, steepness=0.18,
+                      exit_check: Callable[[], None] = lambda: None) -> Image.Image:
     """Produces a normalised PIL image mask.
 
     Normalises the pixel data from the grayscale image to 0 - 255 and applies a sigmoid function
@@ -270,6 +772,7 @@ def _normalized_image(image: Image.Image, steepness=0.18) -> Image.Image:
     :param image: PIL Image (L)
     :param steepness: Intensity of sigmoid curve, smaller values lead to
         less separated colours
+    :param exit_check: Raises TaskExitedException if requested externally
     :return: PIL Image (L) that has been normalised
     """
     min_value, max_value = image.getextrema()
@@ -279,11 +782,47 @@ def _normalized_image(image: Image.Image, steepness=0.18) -> Image.Image:
         return 255 / (1 + math.exp(-steepness * (normalized_value - 127)))
 
     try:
-        return Image.eval(image, sigmoid_normalize)
+        # Same lookup table as Image.eval would build, but built only once
+        lut = [round(sigmoid_normalize(value)) for value in range(256)]
     except ZeroDivisionError:
         # Image was completely flat, already "normalized"
         return image
 
+    return apply_in_tiles(image, lambda tile: tile.point(lut), exit_check)
+
+
+def apply_in_tiles(image: Image.Image, operation: Callable[[Image.Image], Image.Image],
+                   exit_check: Callable[[], None], overlap: int = 0) -> Image.Image:
+    """Applies an operation to horizontal bands of the image, checking
+    whether to exit between them, so that long running filters can be
+    cancelled. Gives the same result as applying it to the whole image.
+
+    :param image: PIL Image
+    :param operation: Operation on a band, returning a new image of the same
+        size, i.e. a filter
+    :param exit_check: Raises TaskExitedException if requested externally
+    :param overlap: Rows around each band that influence the band, i.e. the
+        reach of a blur
+    :return: New PIL Image
+    """
+    if image.height <= FILTER_TILE_HEIGHT:
+        exit_check()
+        return operation(image)
+
+    result = None
+    for top in range(0, image.height, FILTER_TILE_HEIGHT):
+        exit_check()
+        bottom = min(top + FILTER_TILE_HEIGHT, image.height)
+        band_top = max(0, top - overlap)
+        band_bottom = min(image.height, bottom + overlap)
+
+        band = operation(image.crop((0, band_top, image.width, band_bottom)))
+        if result is None:
+            result = Image.new(band.mode, image.size)
+        result.paste(band.crop((0, top - band_top, image.width, bottom - band_top)),
+                     (0, top))
+    return result
+
 
 def _resize_image_in_box(image: Image.Image, box: tuple[int, int, int, int]) \
         -> tuple[Image.Image, tuple[int, int, int, int]]:
@@ -311,6 +850,30 @@ def _resize_image_in_box(image: Image.Image, box: tuple[int, int, int, int]) \
     return scaled_image, new_bounding_box
 
 
+def blur_reach(radius: float) -> int:
+    """Distance in pixels beyond which a Gaussian blur of the given radius
+    has no visible effect
+
+    :param radius: Blur radius (standard deviation) in pixels
+    :return: Distance in pixels
+    """
+    return math.ceil(3 * radius) + 1
+
+
+def padded_box(box: tuple[int, int, int, int], padding: int,
+               max_size: tuple[int, int]) -> tuple[int, int, int, int]:
+    """Returns the box grown by a constant amount on every side, clipped
+    into the region from (0,0) to max_size
+
+    :param box: Box to pad: x1, y1, x2, y2
+    :param padding: Amount to grow each side by in pixels
+    :param max_size: Maximum size to clip padded box to: width, height
+    :return: Padded box
+    """
+    return (max(0, box[0] - padding), max(0, box[1] - padding),
+            min(max_size[0], box[2] + padding), min(max_size[1], box[3] + padding))
+
+
 def scaled_box(box: tuple[int, int, int, int], scale: float,
                max_size: tuple[int, int]) -> tuple[int, int, int, int]:
     """Returns the box scaled from the center by a constant amount along the
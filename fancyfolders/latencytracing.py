@@ -0,0 +1,215 @@
+import atexit
+import json
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, NamedTuple, Optional
+from uuid import UUID
+
+from fancyfolders.constants import TraceEvent
+
+# Finished tasks kept in memory for the summary, most recent last
+TRACE_HISTORY = 500
+
+# Durations of a task, by the events they are measured between
+TRACE_DURATIONS = {
+    "queue_ms": (TraceEvent.SUBMITTED, TraceEvent.STARTED),
+    "render_ms": (TraceEvent.STARTED, TraceEvent.RENDERED),
+    "signal_to_paint_ms": (TraceEvent.RENDERED, TraceEvent.PAINTED),
+    "input_to_paint_ms": (TraceEvent.INPUT, TraceEvent.PAINTED),
+}
+
+
+class LatencySummary(NamedTuple):
+    """Percentiles of the traced tasks, see latency_summary"""
+    displayed: int
+    cancelled: int
+    percentiles: dict[str, tuple[float, float]]
+
+
+class _LatencyTracer:
+    """Timestamps folder generation tasks from the user input that caused
+    them to the paint that displays them. Events come from the UI thread and
+    the worker threads, every access holds the lock. Finished tasks are
+    written to the log by a background thread, never while painting
+    """
+
+    def __init__(self, log_path: Optional[str]) -> None:
+        """Creates a tracer with no tasks
+
+        :param log_path: JSON lines file to append finished tasks to,
+            or None to only keep them in memory
+        """
+        self.log_path = log_path
+        self.log_queue: Optional[queue.SimpleQueue[Optional[dict[str, Any]]]] = None
+        self.log_writer: Optional[threading.Thread] = None
+        if log_path is not None:
+            self.log_queue = queue.SimpleQueue()
+            self.log_writer = threading.Thread(
+                target=self._write_log, name="Latency log writer", daemon=True)
+            self.log_writer.start()
+            atexit.register(self.close)
+
+        self.lock = threading.Lock()
+        self.input_time: Optional[float] = None
+        self.cancelled_tasks = 0
+        # Timestamps and extra fields of the tasks that are not finished yet
+        self.open_records: dict[UUID, tuple[dict[TraceEvent, float], dict[str, Any]]] = {}
+        self.finished_records: deque[dict[str, Any]] = deque(maxlen=TRACE_HISTORY)
+
+    def trace(self, task_uuid: UUID, event: TraceEvent, fields: dict[str, Any]) -> None:
+        """Records an event of a task, see trace"""
+        now = time.perf_counter()
+        with self.lock:
+            if event is TraceEvent.SUBMITTED:
+                timestamps = {TraceEvent.SUBMITTED: now}
+                if self.input_time is not None:
+                    timestamps[TraceEvent.INPUT] = self.input_time
+                self.open_records[task_uuid] = (timestamps, {"uuid": str(task_uuid), **fields})
+                return
+
+            if task_uuid not in self.open_records:
+                return
+            timestamps, record_fields = self.open_records[task_uuid]
+            timestamps[event] = now
+            record_fields.update(fields)
+            if event in (TraceEvent.CANCELLED, TraceEvent.DISCARDED):
+                self.cancelled_tasks += 1
+                self._finish(task_uuid, event)
+
+    def trace_paint(self) -> None:
+        """Finishes every task that was received since the last paint"""
+        now = time.perf_counter()
+        with self.lock:
+            for task_uuid, (timestamps, _) in list(self.open_records.items()):
+                if TraceEvent.RECEIVED in timestamps:
+                    timestamps[TraceEvent.PAINTED] = now
+                    self._finish(task_uuid, TraceEvent.PAINTED)
+
+    def _finish(self, task_uuid: UUID, outcome: TraceEvent) -> None:
+        """Turns the timestamps of a finished task into durations, and keeps
+        and logs it. The lock must be held
+
+        :param task_uuid: Unique ID of the task
+        :param outcome: Last event of the task
+        """
+        timestamps, record = self.open_records.pop(task_uuid)
+        record["time"] = datetime.now().isoformat(timespec="milliseconds")
+        record["outcome"] = outcome.name.lower()
+        for name, (start_event, end_event) in TRACE_DURATIONS.items():
+            if start_event in timestamps and end_event in timestamps:
+                record[name] = round((timestamps[end_event] - timestamps[start_event]) * 1000, 3)
+
+        # Tasks cancelled since the previous displayed one
+        if outcome is TraceEvent.PAINTED:
+            record["cancelled_before"] = self.cancelled_tasks
+            self.cancelled_tasks = 0
+
+        self.finished_records.append(record)
+        if self.log_queue is not None:
+            self.log_queue.put(record)
+
+    def close(self) -> None:
+        """Writes the finished tasks that are still queued and stops the
+        log writer. Called at exit
+        """
+        if self.log_writer is not None and self.log_writer.is_alive():
+            self.log_queue.put(None)
+            self.log_writer.join()
+
+    def _write_log(self) -> None:
+        """Appends finished tasks to the log as they are queued, all those
+        queued at once in one write, until None is queued
+        """
+        running = True
+        while running:
+            records = [self.log_queue.get()]
+            while not self.log_queue.empty():
+                records.append(self.log_queue.get())
+            if None in records:
+                running = False
+                records = [record for record in records if record is not None]
+
+            if records:
+                with open(self.log_path, "a") as file:
+                    file.write("".join(json.dumps(record) + "\n" for record in records))
+
+
+# Set by enable_latency_tracing, tracing is off until then
+_tracer: Optional[_LatencyTracer] = None
+
+
+def enable_latency_tracing(log_path: Optional[str] = None) -> None:
+    """Starts tracing the latency of interactions, for the rest of the run
+
+    :param log_path: JSON lines file to append every finished task to, with
+        its durations in milliseconds, or None to only keep them in memory
+    """
+    global _tracer
+    _tracer = _LatencyTracer(log_path)
+
+
+def latency_tracing_enabled() -> bool:
+    """Whether interactions are being traced
+
+    :return: True if enabled
+    """
+    return _tracer is not None
+
+
+def trace_input() -> None:
+    """Records that the user changed an input, which the tasks submitted
+    next are measured from. Called on the UI thread
+    """
+    if _tracer is not None:
+        _tracer.input_time = time.perf_counter()
+
+
+def trace(task_uuid: UUID, event: TraceEvent, **fields: Any) -> None:
+    """Records an event of a folder generation task. Tasks are only traced
+    once submitted, events of other tasks (i.e. speculative ones) are
+    ignored. Can be called from any thread
+
+    :param task_uuid: Unique ID of the task
+    :param event: Event that happened to the task
+    :param fields: Extra values to log with the task, i.e. its resolution
+    """
+    if _tracer is not None:
+        _tracer.trace(task_uuid, event, fields)
+
+
+def trace_paint() -> None:
+    """Records that the folder icon display was painted, which displays
+    every task received since the last paint. Called on the UI thread
+    """
+    if _tracer is not None:
+        _tracer.trace_paint()
+
+
+def latency_summary() -> LatencySummary:
+    """Median and 95th percentile of each duration over the recently
+    finished tasks
+
+    :return: Number of tasks displayed and cancelled, and the (p50, p95)
+        percentiles of each duration in milliseconds, if it has values
+    """
+    if _tracer is None:
+        return LatencySummary(0, 0, {})
+
+    with _tracer.lock:
+        records = list(_tracer.finished_records)
+
+    percentiles = {}
+    for name in TRACE_DURATIONS:
+        values = [record[name] for record in records if name in record]
+        if len(values) >= 2:
+            quantiles = statistics.quantiles(values, n=20, method="inclusive")
+            percentiles[name] = (statistics.median(values), quantiles[18])
+        elif values:
+            percentiles[name] = (values[0], values[0])
+
+    displayed = sum(record["outcome"] == "painted" for record in records)
+    return LatencySummary(displayed, len(records) - displayed, percentiles)
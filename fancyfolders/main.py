@@ -1,14 +1,37 @@
+import multiprocessing
+import os
+
 from PySide6.QtWidgets import QApplication
 
+from fancyfolders.constants import RenderExecutor
+from fancyfolders.latencytracing import enable_latency_tracing
 from fancyfolders.ui.screens.mainwindow import MainWindow
 
+# Set to a file path to trace the latency of every interaction into it, as
+# JSON lines, and to offer the latency overlay (Debug menu, Ctrl+Shift+L)
+LATENCY_LOG_VARIABLE = "FANCYFOLDERS_LATENCY_LOG"
+
+# Set to "process" to generate folder icons in worker processes rather than
+# on threads of the application, see benchmarks.renderexecutors
+RENDER_EXECUTOR_VARIABLE = "FANCYFOLDERS_RENDER_EXECUTOR"
+
 ##############################
 # START APPLICATION
 ##############################
 
-app = QApplication()
+# Folder generation runs in worker processes, which import this module
+# again and must not start another application
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
+    if os.environ.get(LATENCY_LOG_VARIABLE):
+        enable_latency_tracing(os.environ[LATENCY_LOG_VARIABLE])
+
+    app = QApplication()
 
-window = MainWindow()
-window.show()
+    render_executor = RenderExecutor[
+        os.environ.get(RENDER_EXECUTOR_VARIABLE, RenderExecutor.THREAD.name).upper()]
+    window = MainWindow(render_executor)
+    window.show()
 
-app.exec()
+    app.exec()
@@ -0,0 +1,113 @@
+import numpy as np
+from PIL import Image as PILImage
+from PIL.Image import Image
+from PySide6.QtGui import QImage
+
+from fancyfolders.constants import PREVIEW_CACHE_BUDGET, FolderStyle
+from fancyfolders.imagetransformations import image_key, tint_lut
+from fancyfolders.rendercache import LRUCache
+
+# Format of QPixmaps with transparency on raster platforms. A QImage already
+# in this format becomes a QPixmap without being converted or copied
+PIXMAP_FORMAT = QImage.Format_ARGB32_Premultiplied
+
+# Preview frames by (folder icon, folder style), prepared on the thread that
+# generated the folder icon, for the UI thread to display. Sized like the
+# preview cache, so that cached previews have their frames too
+_preview_frame_cache: LRUCache[QImage] = LRUCache(
+    "preview_frame", max_entries=64, max_size=PREVIEW_CACHE_BUDGET,
+    size_function=lambda frame: frame.sizeInBytes())
+
+
+def preview_frame(image: Image, folder_style: FolderStyle) -> QImage:
+    """Returns the folder icon cropped to the folder and converted to the
+    pixmap format, ready to be displayed. Can be called from any thread, and
+    is cached for as long as the image exists, which must not be modified
+    afterwards
+
+    :param image: PIL Image of the folder icon
+    :param folder_style: Folder style of the folder icon, to crop away any
+        extra space
+    :return: QImage, shared and read-only
+    """
+    return _preview_frame_cache.get_or_create(
+        (image_key(image), folder_style), lambda: _cropped_frame(image, folder_style))
+
+
+class TintPreview:
+    """Tints the same untinted folder icon over and over, i.e. while a tint
+    colour is being picked. The tint lookup table maps each colour on its
+    own, so the distinct colours of the folder icon are found once, and each
+    tint only runs the lookup table over those, a few thousand for a folder
+    with a text or symbol icon, and looks the pixels up in the result
+    """
+
+    def __init__(self, image: Image, folder_style: FolderStyle) -> None:
+        """Finds the distinct colours of the untinted folder icon
+
+        :param image: PIL Image of the untinted folder icon
+        :param folder_style: Folder style of the folder icon
+        """
+        self.base_colour = folder_style.base_colour()
+        cropped_image = _cropped_image(image, folder_style)
+        self.size = cropped_image.size
+
+        # Each RGBA pixel as a single integer, the alpha is looked up along
+        # with the colour since the lookup table leaves it unchanged
+        pixels = np.asarray(cropped_image).view(np.uint32)[..., 0]
+        colours, colour_indices = np.unique(pixels, return_inverse=True)
+        self.colour_indices = colour_indices.reshape(pixels.shape)
+
+        # Distinct colours as a single row image, for the lookup table to filter
+        self.colours = PILImage.fromarray(
+            colours.view(np.uint8).reshape(1, -1, 4), "RGBA")
+
+    def frame(self, tint_colour: tuple[int, int, int]) -> QImage:
+        """Returns the preview frame of the folder icon with the tint colour,
+        the same as preview_frame of the folder icon generated with it
+
+        :param tint_colour: Tint colour (r, g, b)
+        :return: QImage owning its pixels
+        """
+        tinted_colours = np.asarray(self.colours.filter(
+            tint_lut(self.base_colour, tint_colour))).view(np.uint32)[0, :, 0]
+        pixels = np.take(tinted_colours, self.colour_indices)
+        return _converted_frame(pixels.data, *self.size)
+
+
+def _cropped_frame(image: Image, folder_style: FolderStyle) -> QImage:
+    """Crops and converts the folder icon, see preview_frame
+
+    :param image: PIL Image of the folder icon
+    :param folder_style: Folder style of the folder icon
+    :return: QImage owning its pixels
+    """
+    cropped_image = _cropped_image(image, folder_style)
+    return _converted_frame(cropped_image.tobytes(), cropped_image.width, cropped_image.height)
+
+
+def _cropped_image(image: Image, folder_style: FolderStyle) -> Image:
+    """Crops away the extra space around the folder
+
+    :param image: PIL Image of the folder icon
+    :param folder_style: Folder style of the folder icon
+    :return: PIL Image (RGBA)
+    """
+    cropped_image = image.crop(tuple(
+        int(image.width * percent) for percent in folder_style.preview_crop_percentages()))
+    if cropped_image.mode != "RGBA":
+        cropped_image = cropped_image.convert("RGBA")
+    return cropped_image
+
+
+def _converted_frame(pixels: bytes | memoryview, width: int, height: int) -> QImage:
+    """Converts RGBA pixels to the pixmap format
+
+    :param pixels: Pixels, 4 bytes each, row by row
+    :param width: Width in pixels
+    :param height: Height in pixels
+    :return: QImage owning its pixels
+    """
+    # The converted image is a copy, pixels only need to outlive the conversion
+    return QImage(pixels, width, height, width * 4,
+                  QImage.Format_RGBA8888).convertToFormat(PIXMAP_FORMAT)
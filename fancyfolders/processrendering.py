@@ -0,0 +1,333 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Optional, Sequence
+
+from PIL import Image
+
+from fancyfolders.constants import FILTER_TILE_HEIGHT, FolderStyle
+from fancyfolders.imagetransformations import (
+    TaskExitedException, generate_folder_icon, image_key, prewarm_render_caches)
+
+# Seconds between checks of whether a render should be cancelled
+CANCELLATION_POLL_INTERVAL = 0.005
+
+# Renders that can be submitted at once, each with its own cancellation flag
+RENDER_SLOTS = 64
+
+# Icon source images in these modes are passed through shared memory, others
+# (i.e. palette images, whose palette would be lost) are pickled
+SHARED_IMAGE_MODES = ("L", "RGB", "RGBA")
+
+# Image description sent between processes: (shared memory name, mode, size)
+SharedImage = tuple[str, str, tuple[int, int]]
+
+
+class ProcessRenderer:
+    """Generates folder icons in a pool of worker processes, so that the
+    pure Python parts of the generation do not compete with the UI thread
+    for the GIL. Each process loads the base folders, tint lookup tables and
+    fonts once when it starts, and keeps its own render caches.
+
+    Icon source images are copied into shared memory once, and the finished
+    folder icons are returned through shared memory, rather than pickled.
+
+    The renderer is shared by the scheduler, the speculative generation,
+    the tint preview and the saver, so every render is cancelled on its own:
+    it holds one of a fixed number of slots, each with a cancellation flag
+    in shared memory that the process rendering it checks.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        """Starts the worker processes, which prepare in the background
+
+        :param max_workers: Number of worker processes
+        """
+        context = multiprocessing.get_context("spawn")
+        self._cancelled = context.RawArray("b", RENDER_SLOTS)
+        self._free_slots = list(range(RENDER_SLOTS))
+        self._slots_available = threading.Semaphore(RENDER_SLOTS)
+        self._lock = threading.Lock()
+
+        # Icon source images in shared memory by image key: the memory, its
+        # description and the number of renders using it. Only the latest
+        # source is kept once no render uses the others
+        self._shared_sources: dict[int, tuple[SharedMemory, SharedImage, int]] = {}
+        self._latest_source_key: Optional[int] = None
+
+        self._executor = ProcessPoolExecutor(
+            max_workers, mp_context=context, initializer=_initialize_process,
+            initargs=(self._cancelled,))
+
+        # Processes are only started on demand, start them all now
+        self._startup_futures = [self._executor.submit(os.getpid)
+                                 for _ in range(max_workers)]
+
+    def render(self, folder_style: FolderStyle,
+               keep_going: Callable[[], bool] = lambda: True,
+               image: Optional[Image.Image] = None, **kwargs) -> Image.Image:
+        """Generates a folder icon in a worker process, blocking the calling
+        thread until it is done. Takes the same arguments as
+        generate_folder_icon, except for the stage timings. Until the first
+        worker process is ready, renders on the calling thread instead
+
+        :param folder_style: The macOS folder style
+        :param keep_going: Returns False if the render should be cancelled
+        :param image: Image to use as the icon
+        :param kwargs: Other keyword arguments of generate_folder_icon
+        :return: The PIL Image
+        :raises TaskExitedException: The render was cancelled
+        """
+        if not any(future.done() for future in self._startup_futures):
+            return generate_folder_icon(
+                folder_style, keep_going=keep_going, image=image, **kwargs)
+
+        slot = self._acquired_slot(keep_going)
+        source_key = None
+        try:
+            if image is not None and image.mode in SHARED_IMAGE_MODES:
+                key = image_key(image)
+                image = self._acquired_source_image(key, image, keep_going)
+                source_key = key
+            if not keep_going():
+                raise TaskExitedException
+
+            future = self._executor.submit(
+                _render_in_process, slot, folder_style, image, kwargs)
+            while not wait([future], CANCELLATION_POLL_INTERVAL, FIRST_COMPLETED).done:
+                if not keep_going():
+                    self._cancelled[slot] = 1
+                    future.cancel()
+                    break
+
+            # Cancelled renders still wait for the process to exit the render,
+            # at its next cancellation check, so that its result is always
+            # released and no process uses the slot or the source any more
+            wait([future])
+            return _received_image(future)
+        finally:
+            if source_key is not None:
+                self._release_source_image(source_key)
+            self._release_slot(slot)
+
+    def shutdown(self) -> None:
+        """Cancels all renders and stops the worker processes. Renders that
+        must finish, i.e. saves, have to be waited for first
+        """
+        for slot in range(RENDER_SLOTS):
+            self._cancelled[slot] = 1
+        self._executor.shutdown(cancel_futures=True)
+        with self._lock:
+            for memory, _, _ in self._shared_sources.values():
+                _release(memory)
+            self._shared_sources.clear()
+            self._latest_source_key = None
+
+    def _acquired_slot(self, keep_going: Callable[[], bool]) -> int:
+        """Waits for a free render slot and clears its cancellation flag
+
+        :param keep_going: Returns False if the render should be cancelled
+        :return: Index of the slot, to release with _release_slot
+        :raises TaskExitedException: The render was cancelled while waiting
+        """
+        while not self._slots_available.acquire(timeout=CANCELLATION_POLL_INTERVAL):
+            if not keep_going():
+                raise TaskExitedException
+        with self._lock:
+            slot = self._free_slots.pop()
+        self._cancelled[slot] = 0
+        return slot
+
+    def _release_slot(self, slot: int) -> None:
+        """Makes a slot available again, once no process renders in it
+
+        :param slot: Index of the slot
+        """
+        with self._lock:
+            self._free_slots.append(slot)
+        self._slots_available.release()
+
+    def _acquired_source_image(self, key: int, image: Image.Image,
+                               keep_going: Callable[[], bool]) -> SharedImage:
+        """Returns the image copied into shared memory, for one more render.
+        It is only copied once, for as long as any render uses it or it is
+        the latest source image
+
+        :param key: Image key of the image
+        :param image: PIL Image in one of the shared image modes
+        :param keep_going: Returns False if the render should be cancelled
+        :return: Description of the shared image
+        :raises TaskExitedException: The render was cancelled
+        """
+        with self._lock:
+            if key in self._shared_sources:
+                return self._used_source_image(key)
+
+        # Copied without the lock, so that other renders can take and give
+        # back their slots and sources meanwhile
+        memory, shared_image = _shared_image(image, keep_going)
+        with self._lock:
+            if key in self._shared_sources:
+                # Another render of the same image copied it first
+                _release(memory)
+            else:
+                self._shared_sources[key] = (memory, shared_image, 0)
+                previous_key = self._latest_source_key
+                self._latest_source_key = key
+                if previous_key is not None:
+                    self._release_unused_source(previous_key)
+            return self._used_source_image(key)
+
+    def _used_source_image(self, key: int) -> SharedImage:
+        """Counts one more render using the shared image, with the lock held
+
+        :param key: Image key of the image
+        :return: Description of the shared image
+        """
+        memory, shared_image, users = self._shared_sources[key]
+        self._shared_sources[key] = (memory, shared_image, users + 1)
+        return shared_image
+
+    def _release_source_image(self, key: int) -> None:
+        """Marks a render as done with the shared image, removing it if it
+        was the last render using it and it is no longer the latest
+
+        :param key: Image key of the image
+        """
+        with self._lock:
+            memory, shared_image, users = self._shared_sources[key]
+            self._shared_sources[key] = (memory, shared_image, users - 1)
+            if key != self._latest_source_key:
+                self._release_unused_source(key)
+
+    def _release_unused_source(self, key: int) -> None:
+        """Removes the shared image if no render uses it, with the lock held
+
+        :param key: Image key of the image
+        """
+        memory, _, users = self._shared_sources[key]
+        if users == 0:
+            # Processes that attached to the image keep their mapping
+            del self._shared_sources[key]
+            _release(memory)
+
+
+# -----------------------------------------------------------------------------
+# Shared memory images
+
+def _shared_image(image: Image.Image, keep_going: Callable[[], bool] = lambda: True) \
+        -> tuple[SharedMemory, SharedImage]:
+    """Copies the pixels of the image into a new block of shared memory, in
+    bands of rows so that copying a large image can be cancelled
+
+    :param image: PIL Image in one of the shared image modes
+    :param keep_going: Returns False if the copy should be cancelled
+    :return: The shared memory, Description of the shared image
+    :raises TaskExitedException: The copy was cancelled
+    """
+    row_size = image.width * len(image.getbands())
+    memory = SharedMemory(create=True, size=max(1, row_size * image.height))
+    for top in range(0, image.height, FILTER_TILE_HEIGHT):
+        if not keep_going():
+            _release(memory)
+            raise TaskExitedException
+        bottom = min(top + FILTER_TILE_HEIGHT, image.height)
+        memory.buf[top * row_size:bottom * row_size] = \
+            image.crop((0, top, image.width, bottom)).tobytes()
+    return memory, (memory.name, image.mode, image.size)
+
+
+def _received_image(future: Future) -> Image.Image:
+    """Copies the image returned by a render out of shared memory, and
+    releases the memory
+
+    :param future: Finished render, returning the description of the image
+    :return: PIL Image
+    :raises TaskExitedException: The render was cancelled
+    """
+    if future.cancelled():
+        raise TaskExitedException
+
+    name, mode, size = future.result()
+    memory = SharedMemory(name=name)
+    try:
+        return Image.frombytes(mode, size, memory.buf)
+    finally:
+        _release(memory)
+
+
+def _release(memory: SharedMemory) -> None:
+    """Closes and removes a block of shared memory"""
+    memory.close()
+    memory.unlink()
+
+
+# -----------------------------------------------------------------------------
+# Worker processes
+
+# Set in each worker process by the initializer
+_process_cancelled: Optional[Sequence[int]] = None
+_process_source: Optional[tuple[SharedMemory, Image.Image]] = None
+
+
+def _initialize_process(cancelled: Sequence[int]) -> None:
+    """Prepares a worker process, see prewarm_render_caches
+
+    :param cancelled: Cancellation flag of each render slot
+    """
+    global _process_cancelled
+    _process_cancelled = cancelled
+
+    prewarm_render_caches()
+
+
+def _render_in_process(slot: int, folder_style: FolderStyle,
+                       image: Optional[Image.Image | SharedImage],
+                       kwargs: dict) -> SharedImage:
+    """Generates a folder icon in a worker process
+
+    :param slot: Render slot, whose flag is set if the render is cancelled
+    :param folder_style: The macOS folder style
+    :param image: Image to use as the icon, or its description if shared
+    :param kwargs: Other keyword arguments of generate_folder_icon
+    :return: Description of the folder icon in shared memory, which the
+        receiver must release
+    :raises TaskExitedException: The render was cancelled
+    """
+    if isinstance(image, tuple):
+        image = _attached_source_image(image)
+
+    folder_image = generate_folder_icon(
+        folder_style, image=image,
+        keep_going=lambda: not _process_cancelled[slot],
+        **kwargs)
+
+    # The receiver removes the memory, only close it here
+    memory, shared_image = _shared_image(folder_image)
+    memory.close()
+    return shared_image
+
+
+def _attached_source_image(shared_image: SharedImage) -> Image.Image:
+    """Returns the shared icon source image without copying it. The same
+    image object is returned for as long as the source does not change, so
+    that its icon mask stays cached
+
+    :param shared_image: Description of the shared image
+    :return: PIL Image, read-only
+    """
+    global _process_source
+    name, mode, size = shared_image
+
+    if _process_source is None or _process_source[0].name != name:
+        if _process_source is not None:
+            # The image may map the memory, it must be gone before closing it
+            previous_memory = _process_source[0]
+            _process_source = None
+            previous_memory.close()
+        memory = SharedMemory(name=name)
+        image = Image.frombuffer(mode, size, memory.buf, "raw", mode, 0, 1)
+        _process_source = (memory, image)
+    return _process_source[1]
@@ -0,0 +1,151 @@
+from collections import OrderedDict
+from threading import RLock
+from typing import Callable, Generic, Hashable, NamedTuple, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class CacheStats(NamedTuple):
+    """Snapshot of the usage counters of a cache"""
+    hits: int
+    misses: int
+    entries: int
+    max_entries: int
+    size: int = 0
+    max_size: Optional[int] = None
+
+    def hit_rate(self) -> float:
+        """Fraction of lookups that were served from the cache
+
+        :return: Hit rate between 0.0 and 1.0
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class LRUCache(Generic[T]):
+    """A bounded, thread-safe, least recently used cache with hit/miss
+    counters. Folder generation runs on worker threads, so every access is
+    guarded by a lock.
+
+    Cached values are shared between all callers and must be treated as
+    read-only, i.e. copy a cached PIL Image before modifying it in place.
+    """
+
+    def __init__(self, name: str, max_entries: int, max_size: Optional[int] = None,
+                 size_function: Callable[[T], int] = lambda _: 0) -> None:
+        """Creates a new empty cache and registers it for stats reporting
+
+        :param name: Unique name of the cache, used for reporting
+        :param max_entries: Maximum number of values to keep
+        :param max_size: Maximum total size of the values to keep, i.e. a
+            memory budget in bytes, unlimited by default
+        :param size_function: Returns the size of a value, for the budget
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size_function = size_function
+        self._entries: OrderedDict[Hashable, T] = OrderedDict()
+        self._sizes: dict[Hashable, int] = {}
+        self._size = 0
+        self._lock = RLock()
+        self._hits = 0
+        self._misses = 0
+
+        _registered_caches[name] = self
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], T]) -> T:
+        """Returns the cached value for the key, or creates it with the
+        factory and stores it if it is missing
+
+        :param key: Hashable key of the value
+        :param factory: Function to produce the value on a cache miss
+        :return: The cached or newly created value
+        """
+        with self._lock:
+            if key in self._entries:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self._misses += 1
+
+        # Create outside of the lock so that other threads are not blocked
+        # by a slow factory, at worst the value is computed twice
+        value = factory()
+        self.put(key, value)
+        return value
+
+    def get(self, key: Hashable) -> Optional[T]:
+        """Returns the cached value for the key, if there is one
+
+        :param key: Hashable key of the value
+        :return: The cached value, or None if it is missing
+        """
+        with self._lock:
+            if key not in self._entries:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether a value is cached for the key, without counting as a
+        lookup or changing its recency
+        """
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: Hashable, value: T) -> None:
+        """Stores a value, evicting the least recently used ones if full or
+        over the size budget
+
+        :param key: Hashable key of the value
+        :param value: Value to store
+        """
+        size = self.size_function(value)
+        with self._lock:
+            self._size += size - self._sizes.get(key, 0)
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries or (
+                    self.max_size is not None and self._size > self.max_size):
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._size -= self._sizes.pop(evicted_key)
+
+    def clear(self) -> None:
+        """Removes all values and resets the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._size = 0
+            self._hits = 0
+            self._misses = 0
+
+    def stats(self) -> CacheStats:
+        """Returns the current usage counters of the cache
+
+        :return: Cache stats
+        """
+        with self._lock:
+            return CacheStats(self._hits, self._misses, len(self._entries),
+                              self.max_entries, self._size, self.max_size)
+
+
+_registered_caches: dict[str, LRUCache] = {}
+
+
+def cache_stats() -> dict[str, CacheStats]:
+    """Returns the usage counters of every cache created in this process
+
+    :return: Mapping of cache name to its stats
+    """
+    return {name: cache.stats() for name, cache in _registered_caches.items()}
+
+
+def clear_caches() -> None:
+    """Empties every cache created in this process and resets its counters"""
+    for cache in _registered_caches.values():
+        cache.clear()
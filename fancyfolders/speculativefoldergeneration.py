@@ -0,0 +1,149 @@
+import uuid
+from typing import Callable, Hashable, Optional
+
+from PIL.Image import Image
+from PySide6.QtCore import QObject, QThread, QThreadPool, Slot
+
+from fancyfolders.constants import PREVIEW_CACHE_BUDGET, FolderStyle, IconGenerationMethod
+from fancyfolders.imagetransformations import generate_folder_icon, image_key
+from fancyfolders.rendercache import LRUCache
+from fancyfolders.threadsafefoldergeneration import FolderGeneratorWorker
+
+# Generation parameters of a preview: (folder style, resolution, keyword
+# arguments of the folder generation method)
+PreviewParameters = tuple[FolderStyle, int, dict]
+
+# Finished folder icons at preview resolution by their generation parameters,
+# from both requested and speculative folder generation
+_preview_cache: LRUCache[Image] = LRUCache(
+    "preview", max_entries=64, max_size=PREVIEW_CACHE_BUDGET,
+    size_function=lambda image: image.width * image.height * len(image.getbands()))
+
+
+def cached_preview(folder_style: FolderStyle, resolution: int,
+                   kwargs: dict) -> Optional[Image]:
+    """Returns the finished folder icon for the generation parameters, if it
+    has been generated before
+
+    :param folder_style: FolderStyle of the folder
+    :param resolution: Size in pixels of the folder icon
+    :param kwargs: Keyword arguments of the folder generation method
+    :return: PIL Image, shared and read-only, or None
+    """
+    return _preview_cache.get(_preview_key(folder_style, resolution, kwargs))
+
+
+def cache_preview(folder_style: FolderStyle, resolution: int, kwargs: dict,
+                  image: Image) -> None:
+    """Stores a finished folder icon by its generation parameters
+
+    :param folder_style: FolderStyle of the folder
+    :param resolution: Size in pixels of the folder icon
+    :param kwargs: Keyword arguments of the folder generation method
+    :param image: PIL Image, must not be modified afterwards
+    """
+    _preview_cache.put(_preview_key(folder_style, resolution, kwargs), image)
+
+
+def _preview_key(folder_style: FolderStyle, resolution: int, kwargs: dict) -> Hashable:
+    """Key of the generation parameters, leaving out those that the icon
+    generation method does not use, i.e. the text when there is no icon
+
+    :param folder_style: FolderStyle of the folder
+    :param resolution: Size in pixels of the folder icon
+    :param kwargs: Keyword arguments of the folder generation method
+    :return: Hashable key
+    """
+    generation_method = kwargs["generation_method"]
+    if generation_method is IconGenerationMethod.TEXT:
+        icon = (kwargs["text"], kwargs["font_style"], kwargs["icon_scale"])
+    elif generation_method is IconGenerationMethod.IMAGE:
+        icon = (image_key(kwargs["image"]), kwargs["icon_scale"])
+    else:
+        icon = None
+
+    tint_colour = kwargs.get("tint_colour")
+    return (folder_style, resolution, generation_method, icon,
+            None if tint_colour is None else tuple(tint_colour))
+
+
+class SpeculativeFolderGenerator(QObject):
+    """Generates the folder icons that the user is likely to ask for next
+    while they are idle, i.e. one slider tick or palette colour away, so that
+    they can be displayed straight from the preview cache.
+
+    Runs one task at a time on a low priority thread, in the order given,
+    within the memory budget of the preview cache. Must be cancelled as soon
+    as the user changes anything.
+    """
+
+    def __init__(self, render_function: Callable[..., Image] = generate_folder_icon,
+                 parent: Optional[QObject] = None) -> None:
+        """Creates a new speculative folder generator with no tasks
+
+        :param render_function: Folder generation method, the same as the one
+            used for requested folder icons
+        :param parent: Parent object
+        """
+        super().__init__(parent)
+        self.render_function = render_function
+        self.running_worker: Optional[FolderGeneratorWorker] = None
+        self.pending_parameters: list[PreviewParameters] = []
+
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+        self.thread_pool.setThreadPriority(QThread.LowestPriority)
+
+    def start(self, candidates: list[PreviewParameters]) -> None:
+        """Starts generating the candidates that are not cached yet,
+        replacing any previous ones
+
+        :param candidates: Generation parameters, most likely first
+        """
+        self.cancel()
+        self.pending_parameters = [
+            parameters for parameters in candidates
+            if _preview_key(*parameters) not in _preview_cache]
+
+        if self.running_worker is None:
+            self._start_next_worker()
+
+    def cancel(self) -> None:
+        """Stops the running task and forgets the waiting ones"""
+        self.pending_parameters = []
+        if self.running_worker is not None:
+            self.running_worker.stop()
+
+    def is_idle(self) -> bool:
+        """Whether there are no running or waiting tasks
+
+        :return: True if idle
+        """
+        return self.running_worker is None and not self.pending_parameters
+
+    def _start_next_worker(self) -> None:
+        """Starts the next waiting task, if there is one"""
+        if not self.pending_parameters:
+            return
+
+        folder_style, resolution, kwargs = self.pending_parameters.pop(0)
+        worker = FolderGeneratorWorker(
+            uuid.uuid4(), folder_style, self.render_function,
+            resolution=resolution, **kwargs)
+        self.running_worker = worker
+
+        # Completed folder icons are valid even if the task was cancelled
+        # right after, the cache can be filled from the worker thread
+        worker.signals.completed.connect(
+            lambda _, image, __: cache_preview(folder_style, resolution, kwargs, image))
+        worker.signals.finished.connect(self._on_worker_finished)
+
+        # Start the run method rather than the runnable itself, see
+        # FolderGenerationScheduler
+        self.thread_pool.start(worker.run)
+
+    @Slot()
+    def _on_worker_finished(self) -> None:
+        """Called once the running task completes or is stopped"""
+        self.running_worker = None
+        self._start_next_worker()
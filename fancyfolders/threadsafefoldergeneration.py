@@ -1,56 +1,260 @@
+import logging
+import time
+from typing import Callable, Optional
 from uuid import UUID
-from PySide6.QtCore import QObject, QRunnable, Signal, Slot
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+from PySide6.QtGui import QImage
 from PIL.Image import Image
+from PIL.ImageQt import fromqimage
 
-from fancyfolders.constants import FolderStyle
-from fancyfolders.imagetransformations import generate_folder_icon
-
-
-class TaskExitedException(Exception):
-    pass
+from fancyfolders.constants import FolderStyle, TraceEvent
+from fancyfolders.imagedecoding import decoded_image_file, reduced_icon_image
+# TaskExitedException is defined with the folder generation, so that it can
+# be used without Qt, and is imported here for existing users of this module
+from fancyfolders.imagetransformations import TaskExitedException, generate_folder_icon
+from fancyfolders.latencytracing import trace
+from fancyfolders.previewframes import preview_frame
+from fancyfolders.foldericons import IconApplier, default_icon_applier
 
 
 class FolderGeneratorSignals(QObject):
-    """The completion signal for a FolderGeneratorWorker"""
+    """The completion signals for a FolderGeneratorWorker. Finished is
+    emitted after every run, whether it completed or was stopped
+    """
     completed = Signal(UUID, Image, FolderStyle)
+    finished = Signal()
 
 
 class FolderGeneratorWorker(QRunnable):
     """An asynchronous worker object that generates a new folder icon"""
 
-    def __init__(self, uuid: UUID, folder_style: FolderStyle, **kwargs) -> None:
+    def __init__(self, uuid: UUID, folder_style: FolderStyle,
+                 render_function: Callable[..., Image] = generate_folder_icon,
+                 **kwargs) -> None:
         """Create a new folder generator worker with a unique ID, and the
         keyword arguments needed for the folder generation method
 
         :param uuid: Unique ID for this worker
         :param folder_style: FolderStyle of the folder to generate
+        :param render_function: Folder generation method, generate_folder_icon
+            or one with the same arguments, i.e. ProcessRenderer.render
         :param kwargs: Keyword arguments to pass to the folder generation method
         """
         super().__init__()
         self.signals = FolderGeneratorSignals()
         self.uuid = uuid
         self.folder_style = folder_style
+        self.render_function = render_function
         self.kwargs = kwargs
         self.keep_going = True
 
+        # Time stopped, and seconds from then until the worker exited
+        self.stop_time: Optional[float] = None
+        self.stop_latency: Optional[float] = None
+
     @Slot()
     def run(self):
         """Generates the folder icon and emits the resulting image"""
+        trace(self.uuid, TraceEvent.STARTED)
         try:
-            folder_image: Image = generate_folder_icon(
+            folder_image: Image = self.render_function(
                 folder_style=self.folder_style, keep_going=self._should_continue,
                 **self.kwargs)
+            # Prepared here so that the UI thread only has to display it
+            preview_frame(folder_image, self.folder_style)
+            trace(self.uuid, TraceEvent.RENDERED)
             self.signals.completed.emit(self.uuid, folder_image,
                                         self.folder_style)
         except TaskExitedException:
-            pass
+            trace(self.uuid, TraceEvent.CANCELLED)
         except Exception:
             raise ValueError("Folder generation had an unexpected error")
+        finally:
+            if self.stop_time is not None:
+                self.stop_latency = time.perf_counter() - self.stop_time
+            self.signals.finished.emit()
 
     @Slot()
     def stop(self):
         """Stops the current folder generation task"""
+        if self.keep_going:
+            self.stop_time = time.perf_counter()
         self.keep_going = False
 
     def _should_continue(self) -> bool:
         return self.keep_going
+
+
+class FolderGenerationScheduler(QObject):
+    """Runs folder generation tasks one at a time, keeping only the latest
+    request. There is at most one task running and one task waiting: a new
+    request replaces the waiting one and stops the running one, which exits
+    at its next cancellation check.
+    """
+
+    completed = Signal(UUID, Image, FolderStyle)
+
+    def __init__(self, thread_pool: QThreadPool, parent: Optional[QObject] = None,
+                 render_function: Callable[..., Image] = generate_folder_icon) -> None:
+        """Creates a new scheduler with no tasks
+
+        :param thread_pool: Thread pool to run the folder generation in
+        :param parent: Parent object
+        :param render_function: Folder generation method, generate_folder_icon
+            to render on the thread pool itself, or ProcessRenderer.render to
+            wait on it for a worker process
+        """
+        super().__init__(parent)
+        self.thread_pool = thread_pool
+        self.render_function = render_function
+        self.running_worker: Optional[FolderGeneratorWorker] = None
+        self.pending_worker: Optional[FolderGeneratorWorker] = None
+
+    def submit(self, uuid: UUID, folder_style: FolderStyle, **kwargs) -> None:
+        """Requests a folder icon to be generated, superseding all previous
+        requests. The result is emitted through the completed signal
+
+        :param uuid: Unique ID of the task
+        :param folder_style: FolderStyle of the folder to generate
+        :param kwargs: Keyword arguments to pass to the folder generation method
+        """
+        if self.pending_worker is not None:
+            trace(self.pending_worker.uuid, TraceEvent.CANCELLED)
+        self.pending_worker = FolderGeneratorWorker(
+            uuid, folder_style, self.render_function, **kwargs)
+
+        if self.running_worker is None:
+            self._start_pending_worker()
+        else:
+            self.running_worker.stop()
+
+    def cancel(self) -> None:
+        """Stops the running task and forgets the waiting one"""
+        if self.pending_worker is not None:
+            trace(self.pending_worker.uuid, TraceEvent.CANCELLED)
+        self.pending_worker = None
+        if self.running_worker is not None:
+            self.running_worker.stop()
+
+    def is_idle(self) -> bool:
+        """Whether there are no running or waiting tasks
+
+        :return: True if idle
+        """
+        return self.running_worker is None and self.pending_worker is None
+
+    def _start_pending_worker(self) -> None:
+        """Starts the waiting task, if there is one"""
+        worker, self.pending_worker = self.pending_worker, None
+        self.running_worker = worker
+        if worker is None:
+            return
+
+        worker.signals.completed.connect(self.completed)
+        worker.signals.finished.connect(self._on_worker_finished)
+
+        # Start the run method rather than the runnable itself, PySide keeps
+        # a reference to runnables that finish before start returns
+        self.thread_pool.start(worker.run)
+
+    @Slot()
+    def _on_worker_finished(self) -> None:
+        """Called once the running task completes or is stopped"""
+        self.running_worker = None
+        self._start_pending_worker()
+
+
+class FolderIconSaverSignals(QObject):
+    """The progress and completion signals for a FolderIconSaver. Progress
+    is a description of the current step, to display to the user, failure
+    comes with the path and a description of the error
+    """
+    progress = Signal(str)
+    completed = Signal(str)
+    failed = Signal(str, str)
+
+
+class FolderIconSaver(QRunnable):
+    """An asynchronous worker object that encodes a folder icon and sets it
+    on a folder, generating the folder icon first if it is not given
+    """
+
+    def __init__(self, path: str, folder_style: FolderStyle,
+                 folder_image: Optional[Image] = None,
+                 render_function: Callable[..., Image] = generate_folder_icon,
+                 applier: Optional[IconApplier] = None, **kwargs) -> None:
+        """Create a new folder icon saver
+
+        :param path: Absolute path to the folder
+        :param folder_style: FolderStyle of the folder icon
+        :param folder_image: Full resolution folder icon, or None to generate it
+        :param render_function: Folder generation method, see FolderGeneratorWorker
+        :param applier: Icon applier to use, the platform's one if None
+        :param kwargs: Keyword arguments to pass to the folder generation method
+        """
+        super().__init__()
+        self.signals = FolderIconSaverSignals()
+        self.path = path
+        self.folder_style = folder_style
+        self.folder_image = folder_image
+        self.render_function = render_function
+        self.applier = applier or default_icon_applier()
+        self.kwargs = kwargs
+
+    @Slot()
+    def run(self):
+        """Generates the folder icon if needed, encodes it and sets it"""
+        try:
+            folder_image = self.folder_image
+            if folder_image is None:
+                self.signals.progress.emit("Generating icon...")
+                folder_image = self.render_function(
+                    folder_style=self.folder_style, **self.kwargs)
+
+            self.signals.progress.emit("Encoding icon...")
+            image_data = self.applier.encode(folder_image)
+
+            self.signals.progress.emit("Setting icon...")
+            self.applier.apply(image_data, self.path)
+            self.signals.completed.emit(self.path)
+        except Exception as error:
+            logging.exception("Could not save the folder icon")
+            self.signals.failed.emit(self.path, str(error) or type(error).__name__)
+
+
+class ImageDecoderSignals(QObject):
+    """The completion signals for an ImageDecoder, with its unique ID"""
+    completed = Signal(UUID, Image)
+    failed = Signal(UUID)
+
+
+class ImageDecoder(QRunnable):
+    """An asynchronous worker object that decodes a dropped image to use as
+    the icon, either an image file or the image data of the drop
+    """
+
+    def __init__(self, uuid: UUID, source: str | QImage) -> None:
+        """Create a new image decoder
+
+        :param uuid: Unique ID for this decoder
+        :param source: Path to the image file, or the dropped image
+        """
+        super().__init__()
+        self.signals = ImageDecoderSignals()
+        self.uuid = uuid
+        self.source = source
+
+    @Slot()
+    def run(self):
+        """Decodes the image and emits it"""
+        try:
+            if isinstance(self.source, str):
+                image = decoded_image_file(self.source)
+            else:
+                image = fromqimage(self.source)
+                image.load()
+                image = reduced_icon_image(image)
+            self.signals.completed.emit(self.uuid, image)
+        except Exception:
+            logging.exception("Dragged item is not an image file, or could not open")
+            self.signals.failed.emit(self.uuid)
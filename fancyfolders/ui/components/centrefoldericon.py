@@ -1,13 +1,16 @@
-from typing import Optional
+import math
+import time
+from typing import NamedTuple, Optional
 
 from PIL.Image import Image
-from PIL.ImageQt import ImageQt
-from PySide6.QtCore import QPoint, QRect, QSize, Qt
-from PySide6.QtGui import QColor, QPaintEvent, QPainter, QPixmap
+from PySide6.QtCore import QPoint, QSize, Qt, QTimer
+from PySide6.QtGui import QColor, QImage, QPaintEvent, QPainter, QPixmap
 from PySide6.QtWidgets import QGridLayout, QHBoxLayout, QLabel, QSizePolicy, QWidget
 
 from fancyfolders.constants import FolderStyle
 from fancyfolders.external.waitingspinnerwidget import QWaitingSpinner
+from fancyfolders.latencytracing import latency_summary, trace_paint
+from fancyfolders.previewframes import preview_frame
 
 
 class CentreFolderIconContainer(QWidget):
@@ -47,27 +50,113 @@ class CentreFolderIconContainer(QWidget):
         self.folder_icon = CentreFolderIcon()
         self.container.addWidget(self.folder_icon, 0, 0)
 
+        # Latency overlay, above the folder icon, hidden until toggled
+        self.latency_overlay = LatencyOverlay()
+        self.container.addWidget(self.latency_overlay, 0, 0, Qt.AlignTop | Qt.AlignLeft)
+
         self.setLayout(self.container)
 
     def set_loading(self):
         """Starts the spinner to indicate waiting for folder generation"""
         self.spinner.start()
 
+    def stop_loading(self):
+        """Stops the spinner without changing the folder icon"""
+        self.spinner.stop()
+
     def set_image(self, image: Image, folder_style: FolderStyle):
         """Sets the folder icon after validating that it is the latest one"""
         self.spinner.stop()
         self.folder_icon.set_folder_image(image, folder_style)
 
+    def set_frame(self, frame: QImage) -> None:
+        """Sets an already prepared preview frame as the folder icon"""
+        self.spinner.stop()
+        self.folder_icon.set_folder_frame(frame)
+
+    def set_latency_overlay_visible(self, visible: bool) -> None:
+        """Shows or hides the interaction latency overlay
+
+        :param visible: Whether to show the overlay
+        """
+        self.latency_overlay.setVisible(visible)
+
+    def preview_resolution(self, folder_style: FolderStyle) -> int:
+        """Size in pixels of the folder icon needed to fill the display
+
+        :param folder_style: Folder style of the folder icon to display
+        :return: Resolution, never more than the full size of the style
+        """
+        return self.folder_icon.preview_resolution(folder_style)
+
+
+class LatencyOverlay(QLabel):
+    """Displays the median and 95th percentile interaction latencies traced
+    by latencytracing, refreshed while visible
+    """
+
+    REFRESH_INTERVAL = 500  # Milliseconds
+    STYLE_SHEET = "background-color: rgba(0, 0, 0, 160); color: white; " \
+                  "font-family: Menlo, monospace; font-size: 11px; padding: 4px;"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.setStyleSheet(self.STYLE_SHEET)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(self.REFRESH_INTERVAL)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def setVisible(self, visible: bool) -> None:
+        """Refreshes the overlay only while it is visible"""
+        super().setVisible(visible)
+        if visible:
+            self.refresh()
+            self.refresh_timer.start()
+        else:
+            self.refresh_timer.stop()
+
+    def refresh(self) -> None:
+        """Displays the latest latency summary"""
+        summary = latency_summary()
+        lines = ["{} displayed, {} cancelled".format(summary.displayed, summary.cancelled)]
+        for name, (median, p95) in summary.percentiles.items():
+            lines.append("{:<19} p50 {:>6.1f}  p95 {:>6.1f}".format(name, median, p95))
+        self.setText("\n".join(lines))
+        self.adjustSize()
+
+
+class PaintStats(NamedTuple):
+    """Paint counters of a CentreFolderIcon, see CentreFolderIcon.paint_stats"""
+    paints: int
+    scales: int
+    total_time: float
+
+    def average_ms(self) -> float:
+        """Average time of a paint in milliseconds"""
+        return self.total_time * 1000 / self.paints if self.paints else 0.0
+
 
 class CentreFolderIcon(QLabel):
     """Displays the scaled preview folder image"""
 
     folder_pixmap: Optional[QPixmap] = None
 
+    # The folder pixmap scaled to fit the widget, and what it was scaled for:
+    # (pixmap cache key, width, height, device pixel ratio). Spinner ticks and
+    # window exposes repaint the widget without changing any of them
+    scaled_pixmap: Optional[QPixmap] = None
+    scaled_pixmap_key: Optional[tuple[int, int, int, float]] = None
+
     # TODO: override drag enter to render a dotted box around to accept drops
 
     def __init__(self):
         super().__init__()
+        self.paint_count = 0
+        self.scale_count = 0
+        self.paint_time = 0.0
 
     def set_folder_image(self, image: Image,
                          folder_style=FolderStyle.big_sur_light) -> None:
@@ -77,36 +166,73 @@ class CentreFolderIcon(QLabel):
         :param folder_style: The folder style of the image to set in order to
             crop away any extra space
         """
-        crop_rect_percentages = folder_style.preview_crop_percentages()
-        crop_rect = QRect()
-        crop_rect.setCoords(
-            *tuple(int(image.size[0] * percent) for percent in crop_rect_percentages))
+        # Cropped and converted on the worker thread that generated it, if
+        # it came from one, so that uploading it is all that is left to do
+        self.set_folder_frame(preview_frame(image, folder_style))
 
-        # Remove any unnecessary blank space on the image to avoid weird UI layout
-        cropped_image: ImageQt = ImageQt(image).copy(crop_rect)
+    def set_folder_frame(self, frame: QImage) -> None:
+        """Sets a preview frame on the display
 
-        self.folder_pixmap = QPixmap(cropped_image)
+        :param frame: QImage cropped to the folder, see preview_frame
+        """
+        self.folder_pixmap = QPixmap.fromImage(frame)
         self.update()
 
+    def preview_resolution(self, folder_style: FolderStyle) -> int:
+        """Size in pixels of the (uncropped) folder icon needed to fill the
+        widget at the current device pixel ratio
+
+        :param folder_style: Folder style of the folder icon to display
+        :return: Resolution, never more than the full size of the style
+        """
+        x1, y1, x2, y2 = folder_style.preview_crop_percentages()
+        crop_width, crop_height = x2 - x1, y2 - y1
+
+        width = max(self.width(), self.minimumWidth())
+        height = max(self.height(), self.minimumHeight())
+
+        # The cropped image is scaled to fit, keeping its aspect ratio
+        display_width = min(width, height * crop_width / crop_height)
+        resolution = math.ceil(
+            display_width * self.devicePixelRatio() / crop_width)
+
+        return min(resolution, folder_style.size())
+
+    def paint_stats(self) -> PaintStats:
+        """Number of paints, how many of them scaled the folder pixmap, and
+        the total time spent painting
+
+        :return: Paint counters since the widget was created
+        """
+        return PaintStats(self.paint_count, self.scale_count, self.paint_time)
+
     def paintEvent(self, _: QPaintEvent) -> None:
         """Custom paint event to scale the image when the size of the
         widget changes.
         """
         if self.folder_pixmap is None:
             return
+        start_time = time.perf_counter()
 
         dpi_ratio = self.devicePixelRatio()
-        self.folder_pixmap.setDevicePixelRatio(dpi_ratio)
-
         size = QSize(int(self.size().width() * dpi_ratio),
                      int(self.size().height() * dpi_ratio))
-        painter = QPainter(self)
-        point = QPoint(0, 0)
 
-        scaled_pix = self.folder_pixmap.scaled(
-            size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        point.setX(int((size.width() - scaled_pix.width()) / (2 * dpi_ratio)))
-        point.setY(int((size.height() - scaled_pix.height()) / (2 * dpi_ratio)))
+        key = (self.folder_pixmap.cacheKey(), size.width(), size.height(), dpi_ratio)
+        if self.scaled_pixmap_key != key:
+            self.scaled_pixmap = self.folder_pixmap.scaled(
+                size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self.scaled_pixmap.setDevicePixelRatio(dpi_ratio)
+            self.scaled_pixmap_key = key
+            self.scale_count += 1
+        scaled_pix = self.scaled_pixmap
 
+        painter = QPainter(self)
+        point = QPoint(int((size.width() - scaled_pix.width()) / (2 * dpi_ratio)),
+                       int((size.height() - scaled_pix.height()) / (2 * dpi_ratio)))
         painter.drawPixmap(point, scaled_pix)
         painter.end()
+
+        self.paint_count += 1
+        self.paint_time += time.perf_counter() - start_time
+        trace_paint()
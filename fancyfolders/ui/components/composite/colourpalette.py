@@ -1,5 +1,6 @@
 from typing import Callable, Optional
 
+from PySide6.QtGui import QColor
 from PySide6.QtWidgets import QButtonGroup, QColorDialog, QHBoxLayout
 
 from fancyfolders.constants import TintColour
@@ -9,14 +10,19 @@ from fancyfolders.ui.components.colourradiobutton import ColourButtonType, Colou
 class ColourPalette(QHBoxLayout):
     """Represents a collection of buttons to select a folder tint colour"""
 
-    def __init__(self, on_change: Callable[[], None]):
+    def __init__(self, on_change: Callable[[], None],
+                 on_preview: Optional[Callable[[Optional[tuple[int, int, int]]], None]] = None):
         """Constructs a new colour palette
 
         :param on_change: Callback to run whenever a selection is made
+        :param on_preview: Callback to run with each colour the multicolour
+            dialog passes through while it is open, and with None once it
+            closes, before the selection (if any) is made
         """
         super().__init__()
 
         self.on_change = on_change
+        self.on_preview = on_preview
 
         # Variable to store current multicolour choice
         self.current_multicolour = None
@@ -46,11 +52,26 @@ class ColourPalette(QHBoxLayout):
         self.reset()
 
     def _choose_multicolour(self):
-        """Opens a dialog panel to set the multicolour colour"""
+        """Opens a dialog panel to set the multicolour colour, previewing
+        the colours passed through on the way if there is a preview callback
+        """
         colour_dialog = QColorDialog()
-        if colour_dialog.exec():
+        if self.current_multicolour is not None:
+            colour_dialog.setCurrentColor(QColor(*self.current_multicolour))
+        if self.on_preview is not None:
+            colour_dialog.currentColorChanged.connect(
+                lambda colour: self.on_preview((colour.red(), colour.green(), colour.blue())))
+
+        accepted = colour_dialog.exec()
+        if self.on_preview is not None:
+            self.on_preview(None)
+
+        if accepted:
             colour = colour_dialog.currentColor()
             self.set_multicolour((colour.red(), colour.green(), colour.blue()))
+        elif self.on_preview is not None:
+            # Display the selection again in place of the previewed colours
+            self.on_change()
 
     def set_multicolour(self, colour: tuple[int, int, int]) -> None:
         """Sets the multicolour and calls the update callback
@@ -77,5 +98,15 @@ class ColourPalette(QHBoxLayout):
 
         raise ValueError("ColourButtonType is not one of the expected types")
 
+    def palette_colours(self) -> list[Optional[tuple[int, int, int]]]:
+        """Gets every colour that can be selected with a single click, i.e.
+        no colour and the tint colours, except the custom multicolour
+
+        :return: The colours (r, g, b), or None for no colour
+        """
+        return [colour_button.colour if colour_button.type is ColourButtonType.COLOUR
+                else None for colour_button in self.colour_buttons
+                if colour_button.type is not ColourButtonType.MULTICOLOUR]
+
     def reset(self) -> None:
         self.colour_buttons[0].setChecked(True)
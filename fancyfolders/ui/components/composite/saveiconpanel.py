@@ -1,4 +1,4 @@
-from typing import Callable
+from typing import Callable, Optional
 
 from PySide6.QtWidgets import QHBoxLayout, QPushButton, QSizePolicy
 
@@ -11,12 +11,14 @@ class SaveIconPanel(InstructionPanel):
     reset the folder icon
     """
 
+    SAVE_TEXT = "Save folder icon"
+
     def __init__(self, on_save: Callable[[], None],
                  on_clear: Callable[[], None]) -> None:
         super().__init__(3, PANEL3_COLOUR)
 
         # Save icon
-        self.generate_button = QPushButton("Save folder icon")
+        self.generate_button = QPushButton(self.SAVE_TEXT)
         self.generate_button.clicked.connect(on_save)
 
         # Clear button
@@ -32,3 +34,12 @@ class SaveIconPanel(InstructionPanel):
 
         # Add main container to instruction panel
         self.addLayout(container)
+
+    def set_saving(self, status: Optional[str]) -> None:
+        """Shows the progress of saving the folder icon on the save button,
+        which can't be clicked until saving is done
+
+        :param status: Progress to show, or None once saving is done
+        """
+        self.generate_button.setEnabled(status is None)
+        self.generate_button.setText(self.SAVE_TEXT if status is None else status)
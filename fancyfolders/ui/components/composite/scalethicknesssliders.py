@@ -42,9 +42,7 @@ class ScaleThicknessSliders(QHBoxLayout):
 
         :return: The icon scale
         """
-        return interpolate_int_to_float_with_midpoint(
-            self.scale_slider.slider.value(), 1, ICON_SCALE_SLIDER_MAX,
-            MINIMUM_ICON_SCALE_VALUE, 1.0, MAXIMUM_ICON_SCALE_VALUE)
+        return self._scale_at(self.scale_slider.slider.value())
 
     def get_thickness(self) -> SFFont:
         """Gets the selected thickness
@@ -53,6 +51,34 @@ class ScaleThicknessSliders(QHBoxLayout):
         """
         return SFFont(self.thickness_slider.slider.value())
 
+    def neighbouring_scales(self) -> list[float]:
+        """Gets the icon scales one tick below and above the selected one
+
+        :return: The icon scales that exist
+        """
+        value = self.scale_slider.slider.value()
+        return [self._scale_at(neighbour) for neighbour in (value - 1, value + 1)
+                if 1 <= neighbour <= ICON_SCALE_SLIDER_MAX]
+
+    def neighbouring_thicknesses(self) -> list[SFFont]:
+        """Gets the thicknesses one tick below and above the selected one
+
+        :return: Enums representing font thickness
+        """
+        value = self.thickness_slider.slider.value()
+        return [font for font in SFFont if abs(font.value - value) == 1]
+
+    @staticmethod
+    def _scale_at(value: int) -> float:
+        """Icon scale of a scale slider position
+
+        :param value: Position of the scale slider
+        :return: The icon scale
+        """
+        return interpolate_int_to_float_with_midpoint(
+            value, 1, ICON_SCALE_SLIDER_MAX,
+            MINIMUM_ICON_SCALE_VALUE, 1.0, MAXIMUM_ICON_SCALE_VALUE)
+
     def reset(self) -> None:
         self.scale_slider.setValue(int((ICON_SCALE_SLIDER_MAX - 1) / 2) + 1)
         self.thickness_slider.setValue(DEFAULT_FONT.value)
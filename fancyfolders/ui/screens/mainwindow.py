@@ -1,16 +1,24 @@
-import logging
 import os
 import uuid
 from uuid import UUID
 from typing import Optional
 
-from PIL.Image import Image, fromqimage, open
-from PySide6.QtCore import QThreadPool, Signal
-from PySide6.QtGui import QAction, QDropEvent, QMouseEvent, Qt
-from PySide6.QtWidgets import QApplication, QLineEdit, QMainWindow, QMenuBar, QVBoxLayout, QWidget
-
-from fancyfolders.constants import FolderStyle, IconGenerationMethod
-from fancyfolders.threadsafefoldergeneration import FolderGeneratorWorker
+from PIL.Image import Image
+from PySide6.QtCore import QThreadPool
+from PySide6.QtGui import QAction, QCloseEvent, QDropEvent, QImage, QMouseEvent
+from PySide6.QtWidgets import (
+    QApplication, QLineEdit, QMainWindow, QMenuBar, QMessageBox, QVBoxLayout, QWidget)
+
+from fancyfolders.constants import (
+    RENDER_PROCESSES, FolderStyle, IconGenerationMethod, RenderExecutor, TraceEvent)
+from fancyfolders.imagetransformations import generate_folder_icon, prewarm_tint_luts
+from fancyfolders.latencytracing import latency_tracing_enabled, trace, trace_input
+from fancyfolders.previewframes import TintPreview
+from fancyfolders.processrendering import ProcessRenderer
+from fancyfolders.speculativefoldergeneration import (
+    PreviewParameters, SpeculativeFolderGenerator, cache_preview, cached_preview)
+from fancyfolders.threadsafefoldergeneration import (
+    FolderGenerationScheduler, FolderGeneratorWorker, FolderIconSaver, ImageDecoder)
 from fancyfolders.ui.components.centrefoldericon import CentreFolderIconContainer
 from fancyfolders.ui.components.composite.colourpalette import ColourPalette
 from fancyfolders.ui.components.composite.folderstyledropdown import FolderStyleDropdown
@@ -19,7 +27,7 @@ from fancyfolders.ui.components.composite.scalethicknesssliders import ScaleThic
 from fancyfolders.ui.components.composite.seticontextpanel import SetIconTextPanel
 from fancyfolders.ui.components.composite.setlocationpanel import SetLocationPanel
 from fancyfolders.ui.screens.aboutpanel import AboutPanel
-from fancyfolders.utilities import generate_unique_folder_filename, set_folder_icon
+from fancyfolders.utilities import generate_unique_folder_filename
 
 
 class MainWindow(QMainWindow):
@@ -33,17 +41,59 @@ class MainWindow(QMainWindow):
     symbol_text: str = ""
     icon_image: Image = None
 
-    # Asynchronous folder icon generation variables
+    # Asynchronous folder icon generation variables. The folder icon is the
+    # full resolution one for the current parameters, once it has been generated
     uuid_to_wait_for: Optional[UUID] = None
     folder_icon: Optional[Image] = None
-    stop_all_previous_workers_signal = Signal()
+    generation_parameters: Optional[tuple[FolderStyle, dict]] = None
+
+    # Saving runs in the background. A save waits for the full resolution
+    # folder icon of its parameters: (folder path, generation parameters)
+    pending_save: Optional[tuple[str, tuple[FolderStyle, dict]]] = None
+    running_saver: Optional[FolderIconSaver] = None
+
+    # Dropped images are decoded in the background, only the latest drop is used
+    uuid_to_decode: Optional[UUID] = None
+
+    # While a multicolour is being picked, the colours passed through are
+    # previewed by tinting the untinted preview of the current parameters,
+    # once it has been generated
+    previewed_tint: Optional[tuple[int, int, int]] = None
+    uuid_to_untint: Optional[UUID] = None
+    tint_preview: Optional[TintPreview] = None
 
-    def __init__(self) -> None:
+    def __init__(self, render_executor: RenderExecutor = RenderExecutor.THREAD) -> None:
+        """Creates the main window
+
+        :param render_executor: Where to run folder generation
+        """
         super().__init__()
 
-        # Common thread pool to run folder generation in
+        # Common thread pool to run folder generation in, or to wait on the
+        # worker processes from
         self.thread_pool = QThreadPool(self)
 
+        if render_executor is RenderExecutor.PROCESS:
+            self.process_renderer: Optional[ProcessRenderer] = ProcessRenderer(RENDER_PROCESSES)
+            self.render_function = self.process_renderer.render
+        else:
+            self.process_renderer = None
+            self.render_function = generate_folder_icon
+
+            # Build the palette tint colours in the background so that
+            # choosing one never has to wait for it
+            self.thread_pool.start(prewarm_tint_luts)
+
+        # Only the latest folder generation request is ever run
+        self.folder_generation_scheduler = FolderGenerationScheduler(
+            self.thread_pool, self, self.render_function)
+        self.folder_generation_scheduler.completed.connect(
+            self.receive_folder_generation_data)
+
+        # Likely next folder icons are generated while idle
+        self.speculative_folder_generator = SpeculativeFolderGenerator(
+            self.render_function, self)
+
         main_layout = QVBoxLayout()
         main_layout.setSpacing(5)
 
@@ -60,7 +110,7 @@ class MainWindow(QMainWindow):
 
         # Folder icon colour palette
         self.colour_palette = ColourPalette(
-            lambda: self.update_folder_generation_variables(True))
+            lambda: self.update_folder_generation_variables(True), self.preview_tint)
         main_layout.addLayout(self.colour_palette)
 
         # Icon scale and font weight slider container
@@ -106,6 +156,16 @@ class MainWindow(QMainWindow):
         self.about_action.triggered.connect(_open_about_panel)
         self.menu.addAction(self.about_action)
 
+        # Only offered when latency tracing was enabled at startup
+        if latency_tracing_enabled():
+            self.debug_menu = self.menu_bar.addMenu("Debug")
+            self.latency_overlay_action = QAction("Latency Overlay", self)
+            self.latency_overlay_action.setCheckable(True)
+            self.latency_overlay_action.setShortcut("Ctrl+Shift+L")
+            self.latency_overlay_action.toggled.connect(
+                self.centre_image.set_latency_overlay_visible)
+            self.debug_menu.addAction(self.latency_overlay_action)
+
     def update_folder_generation_variables(
             self, generate_folder: bool = False,
             new_generation_method: Optional[IconGenerationMethod] = None) -> None:
@@ -131,59 +191,218 @@ class MainWindow(QMainWindow):
         if self.generation_method is IconGenerationMethod.TEXT and not icon_text:
             self.generation_method = IconGenerationMethod.NONE
 
-        # Asynchronously generate new folder icon
+        # Asynchronously generate new folder icon, first at the resolution
+        # of the display and then at full resolution for saving
         if generate_folder:
-            # Keep track of unique ID for this task to only display latest one
-            task_uuid = uuid.uuid4()
+            trace_input()
+            self.cancel_folder_generation()
 
-            # Create new worker task to generate folder icon
             # Ensure all parameters are immutable for thread safety
-            worker = FolderGeneratorWorker(
-                task_uuid, folder_style=folder_style,
-                generation_method=self.generation_method, icon_scale=icon_scale,
-                tint_colour=tint_colour, text=icon_text, font_style=icon_thickness,
-                image=self.icon_image)
-
-            # Connect completion callback to the centreImage object, and set it to
-            # receive the result of this task using its unique ID
-            worker.signals.completed.connect(self.receive_folder_generation_data)
-            self.set_ready_to_receive_folder_generation_data(task_uuid)
-
-            # Stop all other folder generation tasks and make this one stop too in the future
-            self.stop_all_previous_workers_signal.emit()
-            self.stop_all_previous_workers_signal.connect(worker.stop)
-
-            # Start task
-            self.thread_pool.start(worker)
-
-    def set_ready_to_receive_folder_generation_data(self, task_uuid: UUID) -> None:
+            self.generation_parameters = (folder_style, {
+                "generation_method": self.generation_method,
+                "icon_scale": icon_scale, "tint_colour": tint_colour,
+                "text": icon_text, "font_style": icon_thickness,
+                "image": self.icon_image})
+            self.folder_icon = None
+
+            # Display the preview straight away if it was generated before
+            resolution = self.centre_image.preview_resolution(folder_style)
+            preview_image = cached_preview(
+                folder_style, resolution, self.generation_parameters[1])
+            if preview_image is not None:
+                self.uuid_to_wait_for = None
+                task_uuid = uuid.uuid4()
+                trace(task_uuid, TraceEvent.SUBMITTED, resolution=resolution, cached=True)
+                trace(task_uuid, TraceEvent.RECEIVED)
+                self.display_folder_image(preview_image, folder_style)
+            else:
+                self.start_folder_generation(resolution)
+
+    def cancel_folder_generation(self) -> None:
+        """Stops generating folder icons for the current parameters, the
+        ones already running are discarded once they finish
+        """
+        self.speculative_folder_generator.cancel()
+        self.folder_generation_scheduler.cancel()
+        self.uuid_to_wait_for = None
+
+        # A save waiting for the current parameters can't use their folder
+        # icon anymore, it generates its own instead
+        if self.pending_save is not None:
+            filepath, generation_parameters = self.pending_save
+            self.pending_save = None
+            self.start_saving(filepath, generation_parameters)
+
+    def start_folder_generation(self, resolution: int) -> None:
+        """Starts generating the folder icon for the current parameters at the
+        given resolution, superseding all previous folder generation tasks
+
+        :param resolution: Size in pixels of the folder icon to generate
+        """
+        folder_style, kwargs = self.generation_parameters
+        is_preview = resolution < folder_style.size()
+
+        # Keep track of unique ID for this task to only display latest one
+        task_uuid = uuid.uuid4()
+
+        # Set the centreImage object to receive the result of this task using
+        # its unique ID, then schedule it
+        self.set_ready_to_receive_folder_generation_data(
+            task_uuid, show_loading=is_preview)
+        trace(task_uuid, TraceEvent.SUBMITTED, resolution=resolution, cached=False)
+        self.folder_generation_scheduler.submit(
+            task_uuid, folder_style=folder_style, resolution=resolution, **kwargs)
+
+    def set_ready_to_receive_folder_generation_data(
+            self, task_uuid: UUID, show_loading: bool = True) -> None:
         """Sets ready to receive an asynchronously generated folder icon with
         the given unique ID. Once set, will disregard the image data received
         from any previous tasks
 
         :param task_uuid: Unique ID of latest folder icon generation task
+        :param show_loading: Whether to show the loading spinner
         """
         self.uuid_to_wait_for = task_uuid
-        self.centre_image.set_loading()
+        if show_loading:
+            self.centre_image.set_loading()
 
     def receive_folder_generation_data(
             self, task_uuid: UUID, image: Image,
             folder_style: FolderStyle) -> None:
         """Callback from an asynchronous folder icon generation method with a
         given unique ID. If the ID matches the currently accepting one, accepts
-        the image data and outputs it to the screen.
+        the image data and outputs it to the screen. Previews are also kept to
+        display straight away if the same parameters come up again.
 
         :param task_uuid: Unique ID of completed task
         :param image: Folder icon image
         :param folder_style: Folder style of completed folder icon
         """
-        if task_uuid == self.uuid_to_wait_for:
+        if task_uuid != self.uuid_to_wait_for:
+            trace(task_uuid, TraceEvent.DISCARDED)
+        else:
+            trace(task_uuid, TraceEvent.RECEIVED)
             self.uuid_to_wait_for = None
+            if image.width == self.centre_image.preview_resolution(folder_style):
+                cache_preview(folder_style, image.width,
+                              self.generation_parameters[1], image)
+            self.display_folder_image(image, folder_style)
+
+    def display_folder_image(self, image: Image, folder_style: FolderStyle) -> None:
+        """Displays the folder icon for the current parameters. Preview
+        resolution folder icons are then refined to full resolution in the
+        background, once at full resolution the likely next folder icons are
+        generated while idle
+
+        :param image: Folder icon image
+        :param folder_style: Folder style of the folder icon
+        """
+        self.centre_image.set_image(image, folder_style)
+
+        if image.width < folder_style.size():
+            self.start_folder_generation(folder_style.size())
+        else:
             self.folder_icon = image
-            self.centre_image.set_image(image, folder_style)
+            if self.pending_save is not None:
+                filepath, generation_parameters = self.pending_save
+                self.pending_save = None
+                self.start_saving(filepath, generation_parameters, image)
+            self.speculative_folder_generator.start(self.likely_next_parameters())
+
+    def likely_next_parameters(self) -> list[PreviewParameters]:
+        """Generation parameters of the previews that are one user input
+        away from the current ones, most likely first: a scale slider tick,
+        a palette colour, a thickness slider tick, or another folder style
+
+        :return: Generation parameters
+        """
+        folder_style, kwargs = self.generation_parameters
+        candidates = []
+
+        def add_candidate(new_folder_style: FolderStyle = folder_style, **changes) -> None:
+            candidates.append((new_folder_style,
+                               self.centre_image.preview_resolution(new_folder_style),
+                               {**kwargs, **changes}))
+
+        if kwargs["generation_method"] is not IconGenerationMethod.NONE:
+            for icon_scale in self.scale_thickness_sliders.neighbouring_scales():
+                add_candidate(icon_scale=icon_scale)
+        for tint_colour in self.colour_palette.palette_colours():
+            if tint_colour != kwargs["tint_colour"]:
+                add_candidate(tint_colour=tint_colour)
+        if kwargs["generation_method"] is IconGenerationMethod.TEXT:
+            for font_style in self.scale_thickness_sliders.neighbouring_thicknesses():
+                add_candidate(font_style=font_style)
+        for other_folder_style in FolderStyle:
+            if other_folder_style is not folder_style:
+                add_candidate(other_folder_style)
+
+        return candidates
+
+    def preview_tint(self, tint_colour: Optional[tuple[int, int, int]]) -> None:
+        """Displays the folder icon with a tint colour that is being picked,
+        without generating it. The first colour stops the folder generation
+        and gets the untinted preview of the current parameters, every colour
+        after it only tints that preview
+
+        :param tint_colour: Colour being picked (r, g, b), or None once the
+            picking has ended
+        """
+        self.previewed_tint = tint_colour
+        if tint_colour is None:
+            self.uuid_to_untint = None
+            self.tint_preview = None
+        elif self.tint_preview is not None:
+            self.centre_image.set_frame(self.tint_preview.frame(tint_colour))
+        elif self.uuid_to_untint is None:
+            self.start_untinted_preview()
+
+    def start_untinted_preview(self) -> None:
+        """Gets the untinted preview of the current parameters to preview
+        tint colours with, generating it if it was not generated before
+        """
+        self.cancel_folder_generation()
+        self.uuid_to_untint = uuid.uuid4()
+
+        folder_style, kwargs = self.generation_parameters
+        resolution = self.centre_image.preview_resolution(folder_style)
+        kwargs = {**kwargs, "tint_colour": None}
+
+        preview_image = cached_preview(folder_style, resolution, kwargs)
+        if preview_image is not None:
+            self.receive_untinted_preview(self.uuid_to_untint, preview_image, folder_style)
+            return
+
+        self.centre_image.set_loading()
+        worker = FolderGeneratorWorker(
+            self.uuid_to_untint, folder_style, self.render_function,
+            resolution=resolution, **kwargs)
+        worker.signals.completed.connect(self.receive_untinted_preview)
+        self.thread_pool.start(worker.run)
+
+    def receive_untinted_preview(self, task_uuid: UUID, image: Image,
+                                 folder_style: FolderStyle) -> None:
+        """Callback with the untinted preview, displays the colour being
+        picked with it, if it is still being picked
+
+        :param task_uuid: Unique ID of the untinted preview
+        :param image: Untinted folder icon image
+        :param folder_style: Folder style of the folder icon
+        """
+        if task_uuid != self.uuid_to_untint:
+            return
+        self.uuid_to_untint = None
+        cache_preview(folder_style, image.width,
+                      {**self.generation_parameters[1], "tint_colour": None}, image)
+
+        self.tint_preview = TintPreview(image, folder_style)
+        self.centre_image.set_frame(self.tint_preview.frame(self.previewed_tint))
 
     def save_icon(self):
-        """Saves the current folder icon to the existing or new location"""
+        """Saves the current folder icon to the existing or new location, in
+        the background. If the full resolution folder icon is still being
+        generated, waits for it rather than generating it again
+        """
 
         # Get filepath of folder to change, or of new folder to generate
         make_new_folder, filepath = self.set_location_panel.get_output_info()
@@ -193,11 +412,48 @@ class MainWindow(QMainWindow):
         # Reset existing folder settings
         self.set_location_panel.set_existing_folder_filepath(None)
 
-        self.setCursor(Qt.BusyCursor)
-        # TODO: wait for folder generation if not complete yet
-        #       i.e. if self.uuid_to_wait_for is not None
-        set_folder_icon(self.folder_icon, filepath)
-        self.unsetCursor()
+        if self.folder_icon is not None:
+            self.start_saving(filepath, self.generation_parameters, self.folder_icon)
+        else:
+            # Full resolution folder icon is still being refined
+            self.pending_save = (filepath, self.generation_parameters)
+            self.save_icon_panel.set_saving("Waiting for icon...")
+
+    def start_saving(self, filepath: str,
+                     generation_parameters: tuple[FolderStyle, dict],
+                     folder_image: Optional[Image] = None) -> None:
+        """Encodes and sets the folder icon in the background
+
+        :param filepath: Absolute path to the folder
+        :param generation_parameters: Folder style and keyword arguments of
+            the folder generation method, of the folder icon
+        :param folder_image: Full resolution folder icon, or None to generate it
+        """
+        folder_style, kwargs = generation_parameters
+        saver = FolderIconSaver(
+            filepath, folder_style, folder_image, self.render_function, **kwargs)
+        saver.signals.progress.connect(self.save_icon_panel.set_saving)
+        saver.signals.completed.connect(self.finish_saving)
+        saver.signals.failed.connect(self.saving_failed)
+
+        self.running_saver = saver
+        self.save_icon_panel.set_saving("Saving icon...")
+        self.thread_pool.start(saver.run)
+
+    def finish_saving(self, _: str) -> None:
+        """Called once the folder icon is saved, or could not be saved"""
+        self.running_saver = None
+        self.save_icon_panel.set_saving(None)
+
+    def saving_failed(self, filepath: str, error: str) -> None:
+        """Called if the folder icon could not be saved, tells the user why
+
+        :param filepath: Absolute path to the folder
+        :param error: Description of the error
+        """
+        self.finish_saving(filepath)
+        QMessageBox.warning(self, "Could not save the folder icon",
+                            "The icon of {} could not be set:\n{}".format(filepath, error))
 
     def reset_icon(self):
         """Resets the current folder icon"""
@@ -221,9 +477,7 @@ class MainWindow(QMainWindow):
 
         # Dragged data is an image
         if data.hasFormat("application/x-qt-image"):
-            self.icon_image = fromqimage(data.imageData())
-            self.update_folder_generation_variables(
-                True, IconGenerationMethod.IMAGE)
+            self.start_decoding(data.imageData())
             event.accept()
 
         # Dragged item could be a file or directory
@@ -241,20 +495,68 @@ class MainWindow(QMainWindow):
 
                 # Dragged item is a file, which could be an image
                 elif os.path.isfile(path):
-                    try:
-                        self.icon_image = open(path)
-                        self.update_folder_generation_variables(
-                            True, IconGenerationMethod.IMAGE)
-                        event.accept()
-                    except Exception:
-                        logging.exception(
-                            "Dragged item is not an image file, or could not open")
+                    self.start_decoding(path)
+                    event.accept()
 
         # Dragged item includes text (SF Symbol), replace icon text field
         elif data.hasFormat("text/plain"):
             self.set_icon_panel.set_icon_text(data.text())
             event.accept()
 
+    def start_decoding(self, source: str | QImage) -> None:
+        """Decodes a dropped image in the background, then uses it as the
+        icon. Supersedes any previous drops that are still being decoded
+
+        :param source: Path to the image file, or the dropped image
+        """
+        self.uuid_to_decode = uuid.uuid4()
+        self.centre_image.set_loading()
+
+        decoder = ImageDecoder(self.uuid_to_decode, source)
+        decoder.signals.completed.connect(self.receive_decoded_image)
+        decoder.signals.failed.connect(self.decoding_failed)
+        # Ahead of any waiting folder generation, which would be superseded
+        self.thread_pool.start(decoder.run, 1)
+
+    def receive_decoded_image(self, task_uuid: UUID, image: Image) -> None:
+        """Callback from the image decoder, uses the image as the icon if it
+        is from the latest drop
+
+        :param task_uuid: Unique ID of the decoder
+        :param image: Decoded image
+        """
+        if task_uuid == self.uuid_to_decode:
+            self.uuid_to_decode = None
+            self.icon_image = image
+            self.update_folder_generation_variables(
+                True, IconGenerationMethod.IMAGE)
+
+    def decoding_failed(self, task_uuid: UUID) -> None:
+        """Callback from the image decoder if the dropped item could not be
+        decoded, keeps the current icon
+
+        :param task_uuid: Unique ID of the decoder
+        """
+        if task_uuid == self.uuid_to_decode:
+            self.uuid_to_decode = None
+            if self.uuid_to_wait_for is None:
+                self.centre_image.stop_loading()
+
+    def closeEvent(self, event: QCloseEvent) -> None:
+        """Stops the folder generation worker processes when closing, once
+        the folder icons being saved are set
+
+        :param event: Close event to pass through
+        """
+        # Also starts a save that was waiting for the current folder icon
+        self.cancel_folder_generation()
+        # Cancelled folder generation exits at its next check, saves finish
+        self.thread_pool.waitForDone()
+
+        if self.process_renderer is not None:
+            self.process_renderer.shutdown()
+        super().closeEvent(event)
+
     def mousePressEvent(self, event: QMouseEvent) -> None:
         """Clears the focus on any focussed input field when clicking anywhere
         on the window
@@ -1,12 +1,8 @@
 from colorsys import hsv_to_rgb, rgb_to_hsv
-from io import BytesIO
 import os
 import sys
 from typing import cast
 
-import Cocoa
-from PIL.Image import Image
-
 
 #######################
 # COLOUR UTILITIES
@@ -68,27 +64,12 @@ def internal_resource_path(relative_path: str) -> str:
     if getattr(sys, 'frozen', False):
         base_path = sys._MEIPASS
     else:
-        base_path = str(os.path.abspath("./.."))
+        # Root of the repository, independent of the working directory
+        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
     return os.path.join(base_path, relative_path)
 
 
-def set_folder_icon(pil_image: Image, path: str) -> None:
-    """Sets the icon of the file/directory at the specified path to the
-    provided image using the native macOS API, interfaced through PyObjC
-
-    :param pil_image: PIL Image of the folder icon to set
-    :param path: Absolute path to the folder
-    """
-    # Need to first save the image data to a bytes buffer in PNG format
-    # for the PyObjC API method
-    buffered = BytesIO()
-    pil_image.save(buffered, format="PNG")
-
-    ns_image = Cocoa.NSImage.alloc().initWithData_(buffered.getvalue())
-    Cocoa.NSWorkspace.sharedWorkspace().setIcon_forFile_options_(ns_image, path, 0)
-
-
 def generate_unique_folder_filename(directory: str) -> str:
     """Generates a unique folder name in the 'untitled folder' format, in the
     specified directory. I.e. if the folder already exists, increment the number
@@ -0,0 +1,13 @@
+import os
+
+import pytest
+
+# Qt is tested without a window system
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """The application, needed to deliver signals from the worker threads"""
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+
+import pytest
+from PIL import Image
+
+from benchmarks.foldergeneration import REFERENCE_FONT, synthetic_image
+from fancyfolders import batchrendering
+from fancyfolders.batchrendering import read_specs
+from fancyfolders.constants import FolderStyle, IconGenerationMethod, SFFont, TintColour
+
+
+def render_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    batchrendering.add_arguments(parser)
+    return parser
+
+
+def write_jsonl(path: str, rows: list[dict]) -> str:
+    with open(path, "w") as file:
+        file.write("".join(json.dumps(row) + "\n" for row in rows))
+    return path
+
+
+def test_reads_csv(tmp_path):
+    spec_path = tmp_path / "spec.csv"
+    spec_path.write_text("style,text,scale,tint,font,output\n"
+                         "catalina,Aa,1.5,red,black,first.icns\n"
+                         ",,,#ff9aa2,,\n")
+
+    first, second = read_specs(str(spec_path), "out", ".png")
+
+    assert first.output == os.path.join("out", "first.icns")
+    assert first.folder_style is FolderStyle.catalina
+    assert first.generation_method() is IconGenerationMethod.TEXT
+    assert (first.icon_scale, first.font_style) == (1.5, SFFont.black)
+    assert first.tint_colour == TintColour.red.value
+
+    # Empty cells are missing values, which take their defaults
+    assert second.output == os.path.join("out", "folder-2.png")
+    assert second.folder_style is FolderStyle.big_sur_light
+    assert second.generation_method() is IconGenerationMethod.NONE
+    assert second.tint_colour == (0xff, 0x9a, 0xa2)
+
+
+def test_reads_jsonl(tmp_path):
+    spec_path = write_jsonl(str(tmp_path / "spec.jsonl"), [
+        {"image": "icons/logo.png", "resolution": 256},
+        {"text": ""}])
+
+    image_spec, empty_text_spec = read_specs(spec_path, "out", ".icns")
+
+    assert image_spec.image_path == os.path.join(str(tmp_path), "icons", "logo.png")
+    assert image_spec.generation_method() is IconGenerationMethod.IMAGE
+    assert image_spec.resolution == 256
+    assert image_spec.output == os.path.join("out", "folder-1.icns")
+
+    # Empty text is no icon, rather than an empty text mask
+    assert empty_text_spec.generation_method() is IconGenerationMethod.NONE
+
+
+@pytest.mark.parametrize("row, message", [
+    ({"colour": "red"}, "line 2: unknown fields colour"),
+    ({"output": "folder.jpg"}, "line 2: output must end with one of .png, .icns"),
+    ({"style": "mojave"}, "line 2: unknown value 'mojave'"),
+    ({"scale": "large"}, "line 2: could not convert"),
+])
+def test_reports_invalid_rows_with_line_number(tmp_path, row, message):
+    spec_path = write_jsonl(str(tmp_path / "spec.jsonl"), [{}, row])
+
+    with pytest.raises(ValueError, match=message):
+        read_specs(spec_path, "out", ".png")
+
+
+@pytest.mark.parametrize("workers", ("0", "-2", "many"))
+def test_rejects_invalid_worker_counts(workers, capsys):
+    with pytest.raises(SystemExit):
+        render_parser().parse_args(["spec.jsonl", "--workers", workers])
+    assert "--workers" in capsys.readouterr().err
+
+
+def test_renders_every_row(tmp_path):
+    synthetic_image((300, 200)).save(tmp_path / "icon.png")
+    spec_path = write_jsonl(str(tmp_path / "spec.jsonl"), [
+        {"text": "Aa", "font": REFERENCE_FONT.name, "resolution": 64},
+        {"image": "icon.png", "style": "catalina", "tint": "red", "resolution": 64},
+        {"output": "empty.icns"}])
+    output_directory = tmp_path / "icons"
+
+    args = render_parser().parse_args(
+        [spec_path, "--output-directory", str(output_directory), "--workers", "2"])
+    assert batchrendering.run(args) == 0
+
+    for filename in ("folder-1.png", "folder-2.png"):
+        with Image.open(output_directory / filename) as image:
+            assert image.size == (64, 64)
+    assert (output_directory / "empty.icns").read_bytes().startswith(b"icns")
@@ -0,0 +1,30 @@
+import random
+
+import pytest
+
+from benchmarks.cancellation import (
+    DEFAULT_BOUND_MS, cancellation_cases, run_to_completion, stop_latencies)
+from benchmarks.foldergeneration import generation_kwargs, synthetic_image
+from fancyfolders.constants import RenderEngine
+
+# Stopped workers per case and engine
+TRIALS = 5
+
+
+@pytest.fixture(scope="module")
+def images():
+    return {"image_large": synthetic_image((6000, 4000))}
+
+
+@pytest.mark.parametrize("engine", list(RenderEngine), ids=lambda engine: engine.name)
+@pytest.mark.parametrize("case", cancellation_cases(), ids=lambda case: case.name())
+def test_stop_latency_is_bounded(case, engine, images):
+    """Workers stopped at random points during a full resolution render
+    exit within the bound
+    """
+    kwargs = generation_kwargs(case, images)
+    duration = run_to_completion(kwargs, engine)
+    latencies = stop_latencies(kwargs, engine, TRIALS, duration, random.Random(0))
+
+    assert latencies, "every worker finished before it was stopped"
+    assert max(latencies) * 1000 <= DEFAULT_BOUND_MS
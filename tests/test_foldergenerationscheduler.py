@@ -0,0 +1,106 @@
+import gc
+import threading
+import time
+import tracemalloc
+import uuid
+
+from PIL import Image
+from PySide6.QtCore import QCoreApplication, QThreadPool
+
+from fancyfolders.constants import FolderStyle
+from fancyfolders.imagetransformations import TaskExitedException
+from fancyfolders.threadsafefoldergeneration import (
+    FolderGenerationScheduler, FolderGeneratorWorker)
+
+# Scale slider values passed through while dragging it back and forth
+SLIDER_TICKS = 3000
+
+# Memory allocated by the scheduler and its workers that may remain after
+# the drag, independent of the number of ticks
+MAXIMUM_RETAINED_BYTES = 256 * 1024
+
+
+class FakeRenderer:
+    """Render function that takes a few milliseconds, checking whether to
+    stop every millisecond, and counts how many renders run at once
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most_running = 0
+        self.completed = 0
+
+    def __call__(self, folder_style: FolderStyle, keep_going, icon_scale: float,
+                 **_) -> Image.Image:
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        try:
+            for _ in range(3):
+                if not keep_going():
+                    raise TaskExitedException
+                time.sleep(0.001)
+            with self.lock:
+                self.completed += 1
+            return Image.new("RGBA", (16, 16), (int(icon_scale * 100), 0, 0, 255))
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def live_workers() -> int:
+    gc.collect()
+    return sum(isinstance(item, FolderGeneratorWorker) for item in gc.get_objects())
+
+
+def wait_until_idle(scheduler: FolderGenerationScheduler, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not scheduler.is_idle() and time.monotonic() < deadline:
+        QCoreApplication.processEvents()
+        time.sleep(0.001)
+    QCoreApplication.processEvents()
+    assert scheduler.is_idle()
+
+
+def test_dragging_the_slider_thousands_of_times(qapp):
+    thread_pool = QThreadPool()
+    renderer = FakeRenderer()
+    scheduler = FolderGenerationScheduler(thread_pool, render_function=renderer)
+    received = []
+    scheduler.completed.connect(lambda task_uuid, image, _: received.append(task_uuid))
+
+    def drag(ticks: int) -> uuid.UUID:
+        task_uuid = None
+        for tick in range(ticks):
+            task_uuid = uuid.uuid4()
+            scheduler.submit(task_uuid, FolderStyle.big_sur_light,
+                             icon_scale=0.1 + (tick % 20) / 10)
+            # At most one running and one waiting task, whatever the rate
+            queued = (scheduler.running_worker is not None) + \
+                (scheduler.pending_worker is not None)
+            assert queued <= 2
+            if tick % 4 == 0:
+                QCoreApplication.processEvents()
+        return task_uuid
+
+    # Warm up, so that lazily created Qt and Python objects are not counted
+    drag(100)
+    wait_until_idle(scheduler)
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        last_uuid = drag(SLIDER_TICKS)
+        wait_until_idle(scheduler)
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    thread_pool.waitForDone()
+
+    assert renderer.most_running == 1
+    assert renderer.completed < SLIDER_TICKS / 2, "superseded tasks were not skipped"
+    assert received[-1] == last_uuid
+    assert live_workers() == 0
+    assert after - before < MAXIMUM_RETAINED_BYTES
@@ -0,0 +1,100 @@
+import io
+import threading
+
+import pytest
+from PIL import Image
+
+from fancyfolders.constants import IconEncoding
+from fancyfolders.foldericons import (
+    FilesystemIconApplier, IconApplication, IconApplier, apply_many, set_folder_icon)
+
+
+class FakeIconApplier(IconApplier):
+    """Records the icons it is given, and fails for the chosen folders"""
+
+    def __init__(self, failing_paths: tuple[str, ...] = ()) -> None:
+        super().__init__(IconEncoding.PNG_FAST)
+        self.failing_paths = failing_paths
+        self.lock = threading.Lock()
+        self.applied: dict[str, bytes] = {}
+
+    def apply(self, image_data, path: str) -> None:
+        if path in self.failing_paths:
+            raise PermissionError("Permission denied: " + path)
+        with self.lock:
+            self.applied[path] = bytes(image_data)
+
+
+def folder_icon(colour: tuple[int, int, int]) -> Image.Image:
+    return Image.new("RGBA", (64, 64), (*colour, 255))
+
+
+def test_applier_must_implement_apply():
+    class IncompleteIconApplier(IconApplier):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteIconApplier(IconEncoding.PNG)
+
+
+def test_set_folder_icon_encodes_for_the_applier():
+    applier = FakeIconApplier()
+    set_folder_icon(folder_icon((255, 0, 0)), "/folder", applier)
+
+    with Image.open(io.BytesIO(applier.applied["/folder"])) as image:
+        assert image.format == "PNG"
+        assert image.convert("RGBA").getpixel((0, 0)) == (255, 0, 0, 255)
+
+
+def test_apply_many_reports_each_folder_in_order():
+    paths = ["/folder-{}".format(index) for index in range(10)]
+    applier = FakeIconApplier(failing_paths=("/folder-3", "/folder-7"))
+
+    results = apply_many([(folder_icon((index * 20, 0, 0)), path)
+                          for index, path in enumerate(paths)], applier, max_workers=3)
+
+    assert [result.path for result in results] == paths
+    for result in results:
+        if result.path in applier.failing_paths:
+            assert isinstance(result.error, PermissionError)
+            assert result.path in str(result.error)
+        else:
+            assert result == IconApplication(result.path, None)
+
+    # The failures do not stop the other folders
+    assert sorted(applier.applied) == sorted(
+        path for path in paths if path not in applier.failing_paths)
+
+
+def test_filesystem_applier_writes_icon_files(tmp_path):
+    applier = FilesystemIconApplier()
+    set_folder_icon(folder_icon((0, 0, 255)), str(tmp_path), applier)
+
+    with Image.open(tmp_path / ".folder-icon.png") as image:
+        assert image.convert("RGBA").getpixel((0, 0)) == (0, 0, 255, 255)
+    assert (tmp_path / ".directory").read_text() == \
+        "[Desktop Entry]\nIcon=./.folder-icon.png\n"
+
+    # Setting another icon replaces the previous one, leaving no other files
+    set_folder_icon(folder_icon((0, 255, 0)), str(tmp_path), applier)
+    with Image.open(tmp_path / ".folder-icon.png") as image:
+        assert image.convert("RGBA").getpixel((0, 0)) == (0, 255, 0, 255)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [".directory", ".folder-icon.png"]
+
+
+def test_filesystem_applier_writes_icns(tmp_path):
+    set_folder_icon(folder_icon((0, 0, 255)), str(tmp_path),
+                    FilesystemIconApplier(IconEncoding.ICNS))
+
+    assert (tmp_path / ".folder-icon.icns").read_bytes().startswith(b"icns")
+    assert "Icon=./.folder-icon.icns" in (tmp_path / ".directory").read_text()
+
+
+def test_filesystem_applier_reports_missing_folders(tmp_path):
+    results = apply_many([(folder_icon((0, 0, 0)), str(tmp_path / "missing")),
+                          (folder_icon((0, 0, 0)), str(tmp_path))],
+                         FilesystemIconApplier())
+
+    assert isinstance(results[0].error, NotADirectoryError)
+    assert results[1].error is None
+    assert (tmp_path / ".folder-icon.png").exists()
@@ -0,0 +1,87 @@
+import itertools
+import threading
+import time
+from concurrent.futures import wait
+
+import pytest
+
+from benchmarks.foldergeneration import synthetic_image
+from fancyfolders.constants import FolderStyle, IconEncoding, IconGenerationMethod
+from fancyfolders.foldericons import IconApplier
+from fancyfolders.imagetransformations import TaskExitedException
+from fancyfolders.processrendering import ProcessRenderer
+from fancyfolders.threadsafefoldergeneration import FolderIconSaver
+
+
+class RecordingIconApplier(IconApplier):
+    """Records the folders whose icon would be set, or fails to set any"""
+
+    def __init__(self, error: Exception = None) -> None:
+        super().__init__(IconEncoding.PNG)
+        self.error = error
+        self.applied_paths = []
+
+    def apply(self, image_data, path: str) -> None:
+        if self.error is not None:
+            raise self.error
+        self.applied_paths.append(path)
+
+
+@pytest.fixture(scope="module")
+def renderer():
+    renderer = ProcessRenderer(2)
+    # Renders only go to the processes once they have started
+    wait(renderer._startup_futures)
+    yield renderer
+    renderer.shutdown()
+
+
+def test_save_is_not_cancelled_by_other_renders(renderer, qapp):
+    """Previews cancelled while a save renders its folder icon in the same
+    renderer do not cancel the save
+    """
+    saving = threading.Event()
+
+    def cancel_previews():
+        # Full size and a new tint each time, so that none is cached
+        for red in itertools.cycle(range(256)):
+            if not saving.is_set():
+                break
+            deadline = time.monotonic() + 0.01
+            try:
+                renderer.render(FolderStyle.catalina, tint_colour=(red, 100, 200),
+                                keep_going=lambda: time.monotonic() < deadline)
+            except TaskExitedException:
+                pass
+
+    applier = RecordingIconApplier()
+    saver = FolderIconSaver(
+        "/folder", FolderStyle.big_sur_light, render_function=renderer.render,
+        applier=applier, generation_method=IconGenerationMethod.IMAGE,
+        image=synthetic_image((3000, 2000)))
+    failures = []
+    saver.signals.failed.connect(lambda path, error: failures.append(error))
+
+    saving.set()
+    previews = threading.Thread(target=cancel_previews)
+    previews.start()
+    try:
+        saver.run()
+    finally:
+        saving.clear()
+        previews.join()
+
+    assert failures == []
+    assert applier.applied_paths == ["/folder"]
+
+
+def test_failed_save_reports_the_error(qapp):
+    saver = FolderIconSaver(
+        "/folder", FolderStyle.big_sur_light, folder_image=synthetic_image((64, 64)),
+        applier=RecordingIconApplier(PermissionError("Permission denied")))
+    failures = []
+    saver.signals.failed.connect(lambda path, error: failures.append((path, error)))
+
+    saver.run()
+
+    assert failures == [("/folder", "Permission denied")]
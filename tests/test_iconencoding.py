@@ -0,0 +1,89 @@
+import struct
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from benchmarks.foldergeneration import synthetic_image
+from fancyfolders.constants import IconEncoding
+from fancyfolders.iconencoding import (
+    ICNS_ENTRY_SIZES, ICNS_HEADER_SIZE, ICONSET_SIZES, encoded_folder_icon,
+    encoded_icns, icon_pyramid)
+
+
+@pytest.fixture(scope="module")
+def folder_icon():
+    return synthetic_image((1024, 1024))
+
+
+def icns_entries(data: bytes) -> dict[bytes, bytes]:
+    """Entries of an ICNS file by type, checking the lengths on the way"""
+    assert data[:4] == b"icns"
+    assert struct.unpack(">i", data[4:8])[0] == len(data)
+
+    entries = {}
+    offset = ICNS_HEADER_SIZE
+    while offset < len(data):
+        entry_type = data[offset:offset + 4]
+        length = struct.unpack(">i", data[offset + 4:offset + 8])[0]
+        entries[entry_type] = data[offset + ICNS_HEADER_SIZE:offset + length]
+        offset += length
+    assert offset == len(data)
+    return entries
+
+
+def test_pyramid_has_every_size(folder_icon):
+    pyramid = icon_pyramid(folder_icon)
+
+    assert list(pyramid) == list(ICONSET_SIZES)
+    assert pyramid[1024] is folder_icon
+    for size, level in pyramid.items():
+        assert level.size == (size, size)
+
+
+def test_pyramid_levels_are_resampled_from_the_next_larger(folder_icon):
+    pyramid = icon_pyramid(folder_icon)
+
+    for larger_size, size in zip(ICONSET_SIZES, ICONSET_SIZES[1:]):
+        expected_level = pyramid[larger_size].resize((size, size), Image.LANCZOS)
+        assert np.array_equal(np.asarray(pyramid[size]), np.asarray(expected_level))
+
+
+def test_icns_has_an_entry_of_each_size(folder_icon):
+    entries = icns_entries(encoded_icns(folder_icon))
+
+    # A table of contents listing every entry, in order
+    table_of_contents = entries.pop(b"TOC ")
+    assert [table_of_contents[offset:offset + 4]
+            for offset in range(0, len(table_of_contents), ICNS_HEADER_SIZE)] == list(entries)
+
+    assert set(entries) == set(ICNS_ENTRY_SIZES)
+    pyramid = icon_pyramid(folder_icon)
+    for entry_type, png_data in entries.items():
+        size = ICNS_ENTRY_SIZES[entry_type]
+        with Image.open(BytesIO(png_data)) as image:
+            assert image.format == "PNG"
+            assert np.array_equal(np.asarray(image), np.asarray(pyramid[size]))
+
+
+def test_icns_opens_with_pillow(folder_icon):
+    with Image.open(BytesIO(encoded_icns(folder_icon))) as image:
+        assert image.format == "ICNS"
+        assert image.size == (1024, 1024)
+
+
+def test_icns_is_encoded_once_per_image(folder_icon):
+    data = encoded_icns(folder_icon)
+
+    assert encoded_icns(folder_icon) is data
+    assert encoded_icns(folder_icon.copy()) == data
+    assert encoded_icns(folder_icon.copy()) is not data
+
+
+@pytest.mark.parametrize("encoding, image_format", [
+    (IconEncoding.PNG, "PNG"), (IconEncoding.PNG_FAST, "PNG"), (IconEncoding.TIFF, "TIFF")])
+def test_single_image_encodings_are_lossless(folder_icon, encoding, image_format):
+    with Image.open(BytesIO(encoded_folder_icon(folder_icon, encoding))) as image:
+        assert image.format == image_format
+        assert np.array_equal(np.asarray(image), np.asarray(folder_icon))
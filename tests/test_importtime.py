@@ -0,0 +1,14 @@
+import pytest
+
+from benchmarks.importtime import FORBIDDEN_PACKAGES, HEADLESS_MODULES, imported_modules
+
+
+@pytest.mark.parametrize("module", HEADLESS_MODULES)
+def test_imports_without_heavy_packages(module):
+    """The folder generation modules import in a new interpreter without
+    Qt, PyObjC or NumPy
+    """
+    modules = imported_modules(module)
+
+    assert module in modules
+    assert sorted(name for name in modules if name.split(".")[0] in FORBIDDEN_PACKAGES) == []
@@ -0,0 +1,67 @@
+import pytest
+
+from benchmarks.foldergeneration import REFERENCE_FONT, synthetic_image
+from benchmarks.tintpreview import picked_colours
+from fancyfolders.constants import FolderStyle, IconGenerationMethod, TintColour
+from fancyfolders.imagetransformations import generate_folder_icon, prewarm_tint_luts, tint_lut
+from fancyfolders.previewframes import TintPreview, _cropped_frame, preview_frame
+from fancyfolders.rendercache import cache_stats, clear_caches
+
+RESOLUTION = 256
+
+TINT_COLOURS = [TintColour.red.value, TintColour.white.value, *picked_colours(4)]
+
+
+@pytest.fixture(scope="module")
+def icon_image():
+    return synthetic_image((300, 200))
+
+
+def icon_kwargs(generation_method: IconGenerationMethod, icon_image) -> dict:
+    return {
+        IconGenerationMethod.NONE: {},
+        IconGenerationMethod.IMAGE: {"image": icon_image},
+        IconGenerationMethod.TEXT: {"text": "Aa", "font_style": REFERENCE_FONT},
+    }[generation_method]
+
+
+@pytest.mark.parametrize("generation_method", [
+    IconGenerationMethod.NONE, IconGenerationMethod.IMAGE, IconGenerationMethod.TEXT])
+@pytest.mark.parametrize("folder_style", list(FolderStyle))
+def test_tinted_frames_match_tinted_folders(folder_style, generation_method, icon_image):
+    kwargs = {"generation_method": generation_method, "resolution": RESOLUTION,
+              **icon_kwargs(generation_method, icon_image)}
+    tint_preview = TintPreview(generate_folder_icon(folder_style, **kwargs), folder_style)
+
+    for tint_colour in TINT_COLOURS:
+        tinted_image = generate_folder_icon(folder_style, tint_colour=tint_colour, **kwargs)
+        assert tint_preview.frame(tint_colour) == _cropped_frame(tinted_image, folder_style)
+
+
+def test_preview_frame_is_cached_per_image():
+    image = generate_folder_icon(FolderStyle.catalina, resolution=RESOLUTION)
+    frame = preview_frame(image, FolderStyle.catalina)
+
+    assert preview_frame(image, FolderStyle.catalina) is frame
+    assert frame == _cropped_frame(image, FolderStyle.catalina)
+
+
+def test_picking_colours_keeps_the_palette_luts(icon_image):
+    clear_caches()
+    prewarm_tint_luts()
+    palette_luts = {(folder_style, tint_colour): tint_lut(
+        folder_style.base_colour(), tint_colour.value)
+        for folder_style in FolderStyle for tint_colour in TintColour}
+    misses = cache_stats()["tint_lut"].misses
+
+    # Dragging across the colour dialog tints with many more colours than
+    # the custom colour cache holds
+    tint_preview = TintPreview(generate_folder_icon(
+        FolderStyle.big_sur_light, generation_method=IconGenerationMethod.IMAGE,
+        image=icon_image, resolution=RESOLUTION), FolderStyle.big_sur_light)
+    for tint_colour in picked_colours(2 * cache_stats()["custom_tint_lut"].max_entries):
+        tint_preview.frame(tint_colour)
+
+    for (folder_style, tint_colour), lut in palette_luts.items():
+        assert tint_lut(folder_style.base_colour(), tint_colour.value) is lut
+    assert cache_stats()["tint_lut"].misses == misses
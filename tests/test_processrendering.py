@@ -0,0 +1,56 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pytest
+
+from benchmarks.foldergeneration import synthetic_image
+from fancyfolders.constants import FolderStyle, IconGenerationMethod
+from fancyfolders.imagetransformations import TaskExitedException
+from fancyfolders.processrendering import ProcessRenderer
+
+IMAGE_RENDER = {"generation_method": IconGenerationMethod.IMAGE, "resolution": 256}
+FULL_SIZE_RENDER = {"generation_method": IconGenerationMethod.IMAGE}
+
+
+@pytest.fixture(scope="module")
+def renderer():
+    renderer = ProcessRenderer(2)
+    # Renders only go to the processes once they have started
+    wait(renderer._startup_futures)
+    yield renderer
+    renderer.shutdown()
+
+
+def test_cancelling_a_render_leaves_others_running(renderer):
+    """A render cancelled on one thread does not cancel the render that
+    another thread started before it
+    """
+    kept_image, cancelled_image = synthetic_image((3000, 2000)), synthetic_image((3000, 2001))
+    stop = threading.Event()
+    with ThreadPoolExecutor(2) as executor:
+        kept = executor.submit(renderer.render, FolderStyle.big_sur_light,
+                               image=kept_image, **FULL_SIZE_RENDER)
+        cancelled = executor.submit(renderer.render, FolderStyle.catalina,
+                                    keep_going=lambda: not stop.is_set(),
+                                    image=cancelled_image, **FULL_SIZE_RENDER)
+        time.sleep(0.05)
+        stop.set()
+
+        assert kept.result().size == (1024, 1024)
+        with pytest.raises(TaskExitedException):
+            cancelled.result()
+
+
+def test_queued_renders_keep_their_source_image(renderer):
+    """Renders that wait for a process while the source image changes still
+    find their own source image in shared memory
+    """
+    images = [synthetic_image((600 + 10 * index, 400)) for index in range(6)]
+    with ThreadPoolExecutor(len(images)) as executor:
+        futures = [executor.submit(renderer.render, FolderStyle.big_sur_dark,
+                                   image=image, **IMAGE_RENDER) for image in images]
+        assert all(future.result().size == (256, 256) for future in futures)
+
+    # Only the latest source image is left in shared memory
+    assert len(renderer._shared_sources) == 1
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+from PIL import Image
+
+from benchmarks.foldergeneration import (
+    FULL_REFERENCES_DIRECTORY, MAXIMUM_MEAN_DIFFERENCE, MAXIMUM_PIXEL_DIFFERENCE,
+    benchmark_images, full_resolution_reference_cases, generation_kwargs,
+    perceptual_difference)
+from fancyfolders.constants import RenderEngine
+from fancyfolders.imagetransformations import generate_folder_icon
+from fancyfolders.rendercache import clear_caches
+
+
+@pytest.fixture(scope="module")
+def images():
+    return benchmark_images()
+
+
+@pytest.mark.parametrize("engine", list(RenderEngine), ids=lambda engine: engine.name)
+@pytest.mark.parametrize("case", full_resolution_reference_cases(), ids=lambda case: case.name())
+def test_matches_baseline_reference(case, engine, images):
+    """Full size folder icons look the same as the ones the baseline commit
+    generated, including large images with hard edges that are downscaled
+    """
+    with Image.open(os.path.join(FULL_REFERENCES_DIRECTORY, case.name() + ".png")) as reference:
+        reference.load()
+
+    clear_caches()
+    image = generate_folder_icon(engine=engine, **generation_kwargs(case, images))
+
+    maximum, mean = perceptual_difference(image, reference)
+    assert maximum <= MAXIMUM_PIXEL_DIFFERENCE
+    assert mean <= MAXIMUM_MEAN_DIFFERENCE
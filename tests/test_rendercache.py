@@ -0,0 +1,95 @@
+import pytest
+
+from fancyfolders import rendercache
+from fancyfolders.constants import FolderStyle
+from fancyfolders.imagetransformations import base_folder_image
+from fancyfolders.rendercache import LRUCache, cache_stats, clear_caches
+
+
+@pytest.fixture
+def make_cache():
+    """Creates caches that are unregistered again after the test"""
+    names = []
+
+    def make(name: str, *args, **kwargs) -> LRUCache:
+        names.append(name)
+        return LRUCache(name, *args, **kwargs)
+
+    yield make
+    for name in names:
+        rendercache._registered_caches.pop(name, None)
+
+
+def test_counts_hits_and_misses(make_cache):
+    cache = make_cache("test_counters", max_entries=4)
+    created = []
+
+    def create(value):
+        created.append(value)
+        return value
+
+    assert cache.get_or_create("a", lambda: create(1)) == 1
+    assert cache.get_or_create("a", lambda: create(2)) == 1
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert "b" not in cache
+
+    assert created == [1]
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (2, 2, 1)
+    assert stats.hit_rate() == 0.5
+    assert cache_stats()["test_counters"] == stats
+
+
+def test_evicts_least_recently_used_entry(make_cache):
+    cache = make_cache("test_entries", max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.stats().entries == 2
+
+
+def test_evicts_to_stay_within_size_budget(make_cache):
+    cache = make_cache("test_size", max_entries=10, max_size=10, size_function=len)
+    cache.put("a", "xxxx")
+    cache.put("b", "xxxx")
+    assert cache.stats().size == 8
+
+    # Replacing a value counts only its new size
+    cache.put("a", "xx")
+    assert cache.stats().size == 6
+
+    cache.put("c", "xxxxxx")
+    assert "b" not in cache
+    assert (cache.stats().size, cache.stats().entries) == (8, 2)
+
+    # A value larger than the budget is not kept, nor anything else
+    cache.put("d", "x" * 11)
+    assert (cache.stats().size, cache.stats().entries) == (0, 0)
+
+
+def test_clear_resets_entries_and_counters(make_cache):
+    cache = make_cache("test_clear", max_entries=2, max_size=10, size_function=len)
+    cache.get_or_create("a", lambda: "xx")
+    cache.get_or_create("a", lambda: "xx")
+
+    clear_caches()
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries, stats.size) == (0, 0, 0, 0)
+
+
+def test_base_folder_is_decoded_once():
+    clear_caches()
+    full_size = base_folder_image(FolderStyle.catalina)
+    preview = base_folder_image(FolderStyle.catalina, 128)
+
+    assert base_folder_image(FolderStyle.catalina) is full_size
+    assert base_folder_image(FolderStyle.catalina, 128) is preview
+    assert preview.size == (128, 128)
+    # The preview size is resized from the cached full size folder
+    assert cache_stats()["base_folder"].misses == 2
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from benchmarks.foldergeneration import REFERENCE_FONT, synthetic_image
+from fancyfolders.constants import FolderStyle, IconGenerationMethod, TintColour
+from fancyfolders.imagetransformations import generate_folder_icon, render_stage_stats
+from fancyfolders.rendercache import clear_caches
+
+RESOLUTION = 256
+
+
+@pytest.fixture(scope="module")
+def icon_image():
+    return synthetic_image((300, 200))
+
+
+def render(**kwargs):
+    return generate_folder_icon(FolderStyle.big_sur_light, resolution=RESOLUTION, **kwargs)
+
+
+def stage_misses() -> dict[str, int]:
+    return {name: stats.misses for name, stats in render_stage_stats().items()}
+
+
+def uncached_render(**kwargs):
+    clear_caches()
+    return render(**kwargs)
+
+
+def assert_same_image(image, other_image):
+    assert np.array_equal(np.asarray(image), np.asarray(other_image))
+
+
+def test_same_parameters_are_not_generated_again(icon_image):
+    kwargs = {"generation_method": IconGenerationMethod.IMAGE, "image": icon_image,
+              "tint_colour": TintColour.red.value}
+    clear_caches()
+    image = render(**kwargs)
+    misses = stage_misses()
+
+    assert render(**kwargs) is image
+    assert stage_misses() == misses
+
+
+def test_changing_the_tint_reuses_the_untinted_folder(icon_image):
+    kwargs = {"generation_method": IconGenerationMethod.IMAGE, "image": icon_image}
+    clear_caches()
+    render(tint_colour=TintColour.red.value, **kwargs)
+    misses = stage_misses()
+
+    image = render(tint_colour=TintColour.green.value, **kwargs)
+
+    assert stage_misses() == {**misses, "tinted_folder": misses["tinted_folder"] + 1}
+    assert_same_image(image, uncached_render(tint_colour=TintColour.green.value, **kwargs))
+
+
+def test_changing_the_scale_reuses_the_icon_mask(icon_image):
+    kwargs = {"generation_method": IconGenerationMethod.IMAGE, "image": icon_image}
+    clear_caches()
+    render(icon_scale=1.0, **kwargs)
+    misses = stage_misses()
+
+    image = render(icon_scale=1.5, **kwargs)
+
+    assert stage_misses()["icon_mask"] == misses["icon_mask"]
+    assert stage_misses()["fitted_mask"] == misses["fitted_mask"] + 1
+    assert_same_image(image, uncached_render(icon_scale=1.5, **kwargs))
+
+
+def test_changing_the_text_generates_a_new_mask():
+    kwargs = {"generation_method": IconGenerationMethod.TEXT, "font_style": REFERENCE_FONT}
+    clear_caches()
+    first_image = render(text="Aa", **kwargs)
+    misses = stage_misses()
+
+    second_image = render(text="Ab", **kwargs)
+
+    assert stage_misses()["icon_mask"] == misses["icon_mask"] + 1
+    assert not np.array_equal(np.asarray(first_image), np.asarray(second_image))
+    assert_same_image(render(text="Aa", **kwargs), first_image)
+
+
+def test_cached_folders_are_not_modified_by_tinting():
+    """The untinted folder without an icon is the cached base folder, which
+    tinting must copy rather than change
+    """
+    clear_caches()
+    untinted_image = render()
+    untinted_pixels = np.asarray(untinted_image).copy()
+
+    render(tint_colour=TintColour.red.value)
+
+    assert np.array_equal(np.asarray(render()), untinted_pixels)
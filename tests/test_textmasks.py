@@ -0,0 +1,31 @@
+import pytest
+from PIL import ImageChops, ImageFont
+
+from benchmarks.foldergeneration import BENCHMARK_FONTS, available_fonts
+from benchmarks.textmasks import TYPED_TEXT
+from fancyfolders.imagetransformations import (
+    _composited_text_mask, _rasterized_text_mask, sf_font)
+from fancyfolders.rendercache import clear_caches
+
+TEXTS = ("", " ", "A", "\U00100185", "AV", "To", "Aa Bb", TYPED_TEXT)
+
+
+@pytest.mark.parametrize("font_style", available_fonts(BENCHMARK_FONTS),
+                         ids=lambda font_style: font_style.name)
+@pytest.mark.parametrize("resolution", (64, 1024))
+@pytest.mark.parametrize("text", TEXTS)
+def test_composited_mask_matches_drawn_text(text, resolution, font_style):
+    """Text masks composited from cached glyphs are the same, pixel for
+    pixel, as drawing the whole text with ImageDraw.text
+    """
+    clear_caches()
+    font = sf_font(font_style, int(resolution / 2))
+    if font.layout_engine != ImageFont.Layout.BASIC:
+        pytest.skip("glyphs are only composited with the basic layout engine")
+    expected_mask = _rasterized_text_mask(text, resolution, font)
+
+    # Once with every glyph rasterized for this text, then from the cache
+    for _ in range(2):
+        mask = _composited_text_mask(text, font_style, font)
+        assert mask.size == expected_mask.size
+        assert ImageChops.difference(mask, expected_mask).getbbox() is None